@@ -0,0 +1,217 @@
+"""
+run.py
+mapborn 性能基准测试。
+
+合成输入数据由 synthetic.py 按固定随机种子生成并缓存在数据目录中，结果以 JSON 写出，
+便于在不同版本之间对比::
+
+    python benchmarks/run.py --out base.json                 # 记录基线
+    python benchmarks/run.py --out new.json --compare base.json
+    python benchmarks/run.py --quick --filter vector         # 快速模式，仅运行名称含 vector 的用例
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np  # noqa: E402
+from osgeo import gdal  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mapborn  # noqa: E402
+from mapborn.core import RasterData, VectorData  # noqa: E402
+from mapborn.plot import Map  # noqa: E402
+from synthetic import make_raster, make_vector  # noqa: E402
+from startup import STATEMENTS, measure  # noqa: E402
+
+# (size, dtype, nodata_fraction)
+RASTERS = {
+    'quick': [(1024, 'float32', 0.0), (1024, 'uint8', 0.25)],
+    'full': [(1024, 'float32', 0.0), (4096, 'float32', 0.0), (8192, 'float32', 0.0),
+             (4096, 'uint8', 0.0), (4096, 'int16', 0.0), (4096, 'float32', 0.25),
+             (4096, 'float32', 0.75)],
+}
+# (geom_type, features, vertices)
+VECTORS = {
+    'quick': [('polygon', 1000, 32), ('line', 1000, 32), ('point', 10000, 1)],
+    'full': [('polygon', 1000, 32), ('polygon', 20000, 64), ('polygon', 1000, 2048),
+             ('line', 20000, 64), ('point', 100000, 1), ('point', 1000000, 1)],
+}
+MAP_KWARGS = {'figsize': (8, 8), 'dpi': 150}
+
+
+def bench(name, params, func, setup=None, teardown=None, repeat=5, warmup=1):
+    """
+    对 func(state) 计时，每次运行前调用 setup() 得到 state (不计时)，运行后调用 teardown(state)。
+
+    Returns:
+        dict: {'name', 'params', 'repeat', 'min', 'median', 'mean', 'stdev', 'times'}，单位秒。
+    """
+    times = []
+    for i in range(warmup + repeat):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        func(state)
+        elapsed = time.perf_counter() - start
+        if teardown:
+            teardown(state)
+        if i >= warmup:
+            times.append(elapsed)
+    return {
+        'name': name,
+        'params': params,
+        'repeat': repeat,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.mean(times),
+        'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+        'times': times,
+    }
+
+
+def cases(data_dir, mode, out_dir):
+    """生成 (名称, 参数, 计时函数, setup, teardown) 序列。"""
+    rasters = [(params, make_raster(data_dir, *params)) for params in RASTERS[mode]]
+    vectors = [(params, make_vector(data_dir, *params)) for params in VECTORS[mode]]
+    base = rasters[0][1]
+
+    for (size, dtype, nd), path in rasters:
+        params = {'size': size, 'dtype': dtype, 'nodata_fraction': nd}
+        yield ('raster_load', params, lambda s, p=path: RasterData(p).data, None, None)
+        yield ('raster_load_lazy', dict(params, out_shape=[1200, 1200]),
+               lambda s, p=path: RasterData(p, out_shape=(1200, 1200)).data, None, None)
+
+    for (geom_type, features, vertices), path in vectors:
+        params = {'geom_type': geom_type, 'features': features, 'vertices': vertices}
+
+        def plot_vector(m, p=path):
+            vector = VectorData(p)
+            m._plot_vector_layer(vector, facecolor='none', edgecolor='black')
+            vector.close()
+
+        yield ('plot_vector_layer', params, plot_vector,
+               lambda: Map(base, **MAP_KWARGS), Map.close)
+        if geom_type == 'point':
+            yield ('point_density', params, lambda m, p=path: m.add_point_density(p),
+                   lambda: Map(base, **MAP_KWARGS), Map.close)
+        if geom_type == 'polygon':
+            yield ('choropleth', params,
+                   lambda m, p=path: m.add_vector(p, column='value', classification='natural_breaks'),
+                   lambda: Map(base, **MAP_KWARGS), Map.close)
+
+    yield ('graticule_draw', {}, lambda m: m.add_grid(), lambda: Map(base, **MAP_KWARGS),
+           Map.close)
+    yield ('add_colorbar', {}, lambda m: m.add_colorbar(label='m'),
+           lambda: Map(base, **MAP_KWARGS), Map.close)
+
+    polygon = next(path for (geom_type, _, _), path in vectors if geom_type == 'polygon')
+
+    def decorated():
+        m = Map(base, **MAP_KWARGS)
+        m.add_vector(polygon, fc='none', ec='black', lw=0.5)
+        m.add_grid()
+        m.add_colorbar(label='m')
+        return m
+
+    for dpi in (150, 300):
+        out = os.path.join(out_dir, f'save_{dpi}.png')
+        yield ('save', {'dpi': dpi, 'format': 'png'}, lambda m, o=out, d=dpi: m.save(o, dpi=d),
+               decorated, Map.close)
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'mapborn': mapborn.__version__,
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'matplotlib': matplotlib.__version__,
+        'gdal': gdal.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def _key(result):
+    return result['name'] + json.dumps(result['params'], sort_keys=True)
+
+
+def compare(results, baseline_path, threshold):
+    """打印与基线的中位数耗时比值，返回变慢超过 threshold 的用例数。"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {_key(r): r for r in json.load(f)['results']}
+    regressions = 0
+    print(f"\n{'case':<70}{'base(s)':>10}{'new(s)':>10}{'ratio':>8}")
+    for r in results:
+        old = baseline.get(_key(r))
+        if old is None:
+            continue
+        ratio = r['median'] / old['median'] if old['median'] else float('inf')
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  <-- slower'
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = '  faster'
+        label = r['name'] + ' ' + json.dumps(r['params'], sort_keys=True)
+        print(f"{label[:69]:<70}{old['median']:>10.4f}{r['median']:>10.4f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='mapborn 性能基准测试')
+    parser.add_argument('--out', default='benchmark_results.json', help='结果 JSON 路径')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'mapborn-bench'),
+                        help='合成数据缓存目录')
+    parser.add_argument('--quick', action='store_true', help='使用较小的数据集')
+    parser.add_argument('--repeat', type=int, default=5, help='每个用例的计时次数')
+    parser.add_argument('--filter', default=None, help='只运行名称包含该字符串的用例')
+    parser.add_argument('--compare', default=None, help='与之对比的基线结果 JSON')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='对比时判定变慢的相对阈值 (默认 0.1)')
+    args = parser.parse_args(argv)
+
+    mode = 'quick' if args.quick else 'full'
+    out_dir = os.path.join(args.data_dir, 'out')
+    os.makedirs(out_dir, exist_ok=True)
+
+    results = []
+    for name, params, func, setup, teardown in cases(args.data_dir, mode, out_dir):
+        if args.filter and args.filter not in name:
+            continue
+        result = bench(name, params, func, setup, teardown, repeat=args.repeat)
+        results.append(result)
+        print(f"{name:<20}{json.dumps(params):<60}{result['median']:>10.4f}s")
+
+    if not args.filter or args.filter in 'import':
+        for stmt, heavy in STATEMENTS:
+            result = measure(stmt, repeat=args.repeat, heavy=heavy)
+            results.append(result)
+            print(f"{'import':<20}{json.dumps(result['params']):<60}{result['median']:>10.4f}s")
+
+    report = {'environment': environment(), 'mode': mode, 'results': results}
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n结果已写入: {args.out}")
+
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
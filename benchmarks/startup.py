@@ -0,0 +1,93 @@
+"""
+startup.py
+导入耗时基准：在全新的解释器进程中测量 import 语句耗时，并检查是否提前导入了重量级模块。
+
+    python benchmarks/startup.py                    # 打印结果
+    python benchmarks/startup.py --max-ms 50        # import mapborn 超过 50 ms 时以状态码 1 退出
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('matplotlib', 'matplotlib.pyplot', 'osgeo', 'mpl_toolkits.axes_grid1')
+
+# (语句, 执行后不应出现在 sys.modules 中的模块)
+STATEMENTS = [
+    ('import mapborn', HEAVY),
+    ('from mapborn.batch import MapTemplate', HEAVY),
+    ('from mapborn.profiling import Profiler', HEAVY),
+    ('from mapborn.cache import RenderCache', HEAVY),
+    ('from mapborn.service import AsyncRenderer', HEAVY),
+    ('from mapborn import Map', ('matplotlib.pyplot',)),
+    ('from mapborn import MapGrid', ('matplotlib.pyplot',)),
+]
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+{stmt}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'time': elapsed, 'modules': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(stmt, repeat=5, heavy=HEAVY):
+    """
+    在 repeat 个新进程中分别执行 stmt，返回与 run.py 相同格式的结果字典，
+    额外包含 'loaded': 执行后已导入的重量级模块。
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    times, loaded = [], set()
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', _PROBE.format(stmt=stmt, heavy=tuple(HEAVY))],
+                             capture_output=True, text=True, env=env, cwd=ROOT, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        times.append(result['time'])
+        loaded.update(result['modules'])
+    return {
+        'name': 'import',
+        'params': {'stmt': stmt},
+        'repeat': repeat,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.mean(times),
+        'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+        'times': times,
+        'loaded': sorted(loaded),
+        'unexpected': sorted(loaded & set(heavy)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='mapborn 导入耗时基准')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='import mapborn 中位数耗时上限 (毫秒)')
+    parser.add_argument('--out', default=None, help='结果 JSON 路径 (可选)')
+    args = parser.parse_args(argv)
+
+    failed = False
+    results = []
+    for stmt, heavy in STATEMENTS:
+        r = measure(stmt, args.repeat, heavy)
+        results.append(r)
+        note = f"  意外导入: {', '.join(r['unexpected'])}" if r['unexpected'] else ''
+        print(f"{stmt:<45}{r['median'] * 1000:>9.1f} ms{note}")
+        failed = failed or bool(r['unexpected'])
+
+    if args.max_ms is not None and results[0]['median'] * 1000 > args.max_ms:
+        print(f"import mapborn 超过上限 {args.max_ms} ms")
+        failed = True
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'results': results}, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
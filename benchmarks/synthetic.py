@@ -0,0 +1,179 @@
+"""
+synthetic.py
+基准测试用的合成数据：按参数确定性地生成 GeoTIFF 栅格与 Shapefile 矢量 (同一随机种子结果相同)。
+"""
+import os
+import struct
+import numpy as np
+from osgeo import gdal, ogr, osr
+
+gdal.UseExceptions()
+ogr.UseExceptions()
+
+EPSG = 32650                        # WGS 84 / UTM 50N
+ORIGIN = (300000.0, 4500000.0)      # 左上角 (x, y)
+EXTENT_M = 200000.0                 # 数据覆盖 200 km x 200 km
+
+_DTYPES = {
+    'uint8': (gdal.GDT_Byte, 0, 255),
+    'int16': (gdal.GDT_Int16, -32768, 8000),
+    'float32': (gdal.GDT_Float32, -9999.0, 8000.0),
+}
+_WKB_TYPES = {'polygon': 3, 'line': 2, 'point': 1}
+_OGR_TYPES = {'polygon': ogr.wkbPolygon, 'line': ogr.wkbLineString, 'point': ogr.wkbPoint}
+
+
+def _srs():
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(EPSG)
+    return srs
+
+
+def raster_name(size, dtype, nodata_fraction, seed=0):
+    return f"raster_{size}_{dtype}_nd{int(round(nodata_fraction * 100))}_s{seed}.tif"
+
+
+def vector_name(geom_type, features, vertices, seed=0):
+    return f"{geom_type}_{features}x{vertices}_s{seed}.shp"
+
+
+def make_raster(data_dir, size, dtype='float32', nodata_fraction=0.0, seed=0, overviews=True):
+    """
+    生成 size x size 的单波段 GeoTIFF (分块、DEFLATE 压缩)，已存在时直接返回路径。
+
+    数值为若干正弦波叠加噪声 (类似地形)，nodata_fraction 比例的像元以成片的方式置为 NoData。
+    数据先在 MEM 驱动中构建并建立金字塔，再通过 CreateCopy 写出 GTiff。
+
+    Args:
+        data_dir (str): 输出目录。
+        size (int): 行列数。
+        dtype (str): 'uint8', 'int16' 或 'float32'。
+        nodata_fraction (float): NoData 像元比例 (0~1)。
+        seed (int): 随机种子。
+        overviews (bool): 是否建立内部金字塔。
+    Returns:
+        str: 文件路径。
+    """
+    path = os.path.join(data_dir, raster_name(size, dtype, nodata_fraction, seed))
+    if os.path.exists(path):
+        return path
+    if dtype not in _DTYPES:
+        raise ValueError(f"不支持的数据类型: {dtype}")
+    gdal_type, nodata, vmax = _DTYPES[dtype]
+
+    rng = np.random.default_rng(seed)
+    y, x = np.ogrid[0:1:complex(0, size), 0:1:complex(0, size)]
+    field = np.zeros((size, size), dtype=np.float32)
+    for k in range(1, 5):
+        fx, fy, phase = rng.uniform(1, 6 * k, 3)
+        field += (np.sin(2 * np.pi * (fx * x + phase)) * np.cos(2 * np.pi * fy * y)) / k
+    field += rng.normal(0, 0.05, field.shape).astype(np.float32)
+    field = (field - field.min()) / (field.max() - field.min()) * (vmax - 1)
+
+    if nodata_fraction > 0:
+        # 低频噪声取阈值，得到成片的 NoData 区域
+        coarse = rng.random((max(size // 64, 2),) * 2)
+        idx = np.arange(size) * coarse.shape[0] // size
+        blob = coarse[np.ix_(idx, idx)]
+        field[blob < np.quantile(blob, nodata_fraction)] = nodata
+
+    pixel = EXTENT_M / size
+    mem = gdal.GetDriverByName('MEM').Create('', size, size, 1, gdal_type)
+    mem.SetGeoTransform((ORIGIN[0], pixel, 0, ORIGIN[1], 0, -pixel))
+    mem.SetProjection(_srs().ExportToWkt())
+    band = mem.GetRasterBand(1)
+    band.SetNoDataValue(nodata)
+    band.WriteArray(field.astype(np.dtype(dtype)))
+    if overviews:
+        levels = [2 ** i for i in range(1, 12) if size // 2 ** i >= 256]
+        if levels:
+            mem.BuildOverviews('AVERAGE', levels)
+
+    os.makedirs(data_dir, exist_ok=True)
+    tmp_path = path + '.tmp.tif'
+    gdal.GetDriverByName('GTiff').CreateCopy(
+        tmp_path, mem, options=['TILED=YES', 'COMPRESS=DEFLATE', 'COPY_SRC_OVERVIEWS=YES'])
+    mem = None
+    os.replace(tmp_path, path)
+    return path
+
+
+def _shape_coords(geom_type, rng, center, radius, vertices):
+    """单个要素的坐标 (N, 2)。"""
+    if geom_type == 'point':
+        return np.array([center])
+    if geom_type == 'polygon':
+        t = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+        r = radius * (0.7 + 0.3 * rng.random(vertices))
+        ring = np.column_stack([center[0] + r * np.cos(t), center[1] + r * np.sin(t)])
+        return np.vstack([ring, ring[:1]])
+    steps = rng.normal(0, radius / np.sqrt(vertices), (vertices, 2))
+    return center + np.cumsum(steps, axis=0)
+
+
+def _wkb(geom_type, coords):
+    """构造小端序 2D WKB。"""
+    coords = np.ascontiguousarray(coords, dtype='<f8')
+    if geom_type == 'point':
+        return struct.pack('<BI', 1, 1) + coords[0].tobytes()
+    if geom_type == 'line':
+        return struct.pack('<BII', 1, 2, len(coords)) + coords.tobytes()
+    return struct.pack('<BIII', 1, 3, 1, len(coords)) + coords.tobytes()
+
+
+def make_vector(data_dir, geom_type='polygon', features=1000, vertices=32, seed=0):
+    """
+    生成 ESRI Shapefile 矢量图层，已存在时直接返回路径。
+
+    面为网格排列、互不重叠的星形多边形 (每个外环 vertices 个顶点)；
+    线为随机游走折线 (每条 vertices 个顶点)；点均匀分布。
+    每个要素带有整数字段 id 与浮点字段 value。
+
+    Args:
+        data_dir (str): 输出目录。
+        geom_type (str): 'polygon', 'line' 或 'point'。
+        features (int): 要素数。
+        vertices (int): 每个要素的顶点数 (点图层忽略)。
+        seed (int): 随机种子。
+    Returns:
+        str: .shp 文件路径。
+    """
+    path = os.path.join(data_dir, vector_name(geom_type, features, vertices, seed))
+    if os.path.exists(path):
+        return path
+    if geom_type not in _WKB_TYPES:
+        raise ValueError(f"不支持的几何类型: {geom_type}")
+
+    rng = np.random.default_rng(seed)
+    n = int(np.ceil(np.sqrt(features)))
+    cell = EXTENT_M / n
+    cells = rng.permutation(n * n)[:features]
+    centers = np.column_stack([ORIGIN[0] + (cells % n + 0.5) * cell,
+                               ORIGIN[1] - (cells // n + 0.5) * cell])
+
+    os.makedirs(data_dir, exist_ok=True)
+    stem = os.path.splitext(path)[0]
+    tmp_stem = stem + '_tmp'
+    driver = ogr.GetDriverByName('ESRI Shapefile')
+    ds = driver.CreateDataSource(tmp_stem + '.shp')
+    layer = ds.CreateLayer(os.path.basename(stem), _srs(), _OGR_TYPES[geom_type])
+    layer.CreateField(ogr.FieldDefn('id', ogr.OFTInteger))
+    layer.CreateField(ogr.FieldDefn('value', ogr.OFTReal))
+    defn = layer.GetLayerDefn()
+    values = rng.gamma(2.0, 50.0, features)
+
+    layer.StartTransaction()
+    for i, center in enumerate(centers):
+        coords = _shape_coords(geom_type, rng, center, cell * 0.45, vertices)
+        feature = ogr.Feature(defn)
+        feature.SetField('id', i)
+        feature.SetField('value', float(values[i]))
+        feature.SetGeometry(ogr.CreateGeometryFromWkb(_wkb(geom_type, coords)))
+        layer.CreateFeature(feature)
+    layer.CommitTransaction()
+    ds = None
+
+    for ext in ('.shp', '.shx', '.dbf', '.prj', '.cpg'):
+        if os.path.exists(tmp_stem + ext):
+            os.replace(tmp_stem + ext, stem + ext)
+    return path
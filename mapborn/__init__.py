@@ -1,3 +1,20 @@
 # mapborn/__init__.py
-from .plot import Map
-__version__ = "0.1.0"
\ No newline at end of file
+# Map、MapGrid 在首次访问时才导入 (matplotlib、osgeo 较重)，import mapborn 本身几乎没有开销
+__version__ = "0.1.0"
+__all__ = ['Map', 'MapGrid']
+
+
+def __getattr__(name):
+    if name == 'Map':
+        from .plot import Map
+        globals()['Map'] = Map
+        return Map
+    if name == 'MapGrid':
+        from .grid import MapGrid
+        globals()['MapGrid'] = MapGrid
+        return MapGrid
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
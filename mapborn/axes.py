@@ -1,5 +1,3 @@
-import matplotlib.pyplot as plt
-from mpl_toolkits.axes_grid1 import make_axes_locatable
 
 
 def add_styled_colorbar(fig, mappable, ax=None, location='right',
@@ -12,7 +10,7 @@ def add_styled_colorbar(fig, mappable, ax=None, location='right',
     参数:
     fig : Figure 对象
     mappable : 绘图对象 (imshow/contourf result)
-    ax : 依附的主坐标轴
+    ax : 依附的主坐标轴；为坐标轴列表时生成多个子图共享的一条色带 (占用各子图同侧的空间)
     location : 位置 ('right', 'left', 'bottom', 'top')
     width : 色带宽度/高度 (如 "5%")
     pad : 色带与图的间距 (如 "2%")
@@ -26,16 +24,33 @@ def add_styled_colorbar(fig, mappable, ax=None, location='right',
 
     orientation = 'vertical' if location in ['right', 'left'] else 'horizontal'
 
-    divider = make_axes_locatable(ax)
-    cax = divider.append_axes(location, size=width, pad=pad)
+    if isinstance(ax, (list, tuple)):
+        # 百分比字符串换算为相对子图区域的比例
+        def fraction(value):
+            return float(value.rstrip('%')) / 100 if isinstance(value, str) else value
 
-    cbar = fig.colorbar(
-        mappable,
-        cax=cax,
-        orientation=orientation,
-        extend=extend,
-        label=label
-    )
+        cbar = fig.colorbar(
+            mappable,
+            ax=list(ax),
+            location=location,
+            fraction=fraction(width),
+            pad=fraction(pad),
+            extend=extend,
+            label=label
+        )
+    else:
+        from mpl_toolkits.axes_grid1 import make_axes_locatable
+
+        divider = make_axes_locatable(ax)
+        cax = divider.append_axes(location, size=width, pad=pad)
+
+        cbar = fig.colorbar(
+            mappable,
+            cax=cax,
+            orientation=orientation,
+            extend=extend,
+            label=label
+        )
 
     cbar.set_label(label, size=label_size, color=color, family=font_family)
 
@@ -0,0 +1,206 @@
+"""
+batch.py
+批量出图：可复用的地图模板与基于进程池的并行渲染。
+"""
+import os
+import json
+import hashlib
+import traceback
+import multiprocessing
+from collections import namedtuple
+
+# 模板允许记录的 Map 方法
+TEMPLATE_METHODS = ('set_title', 'set_cmap', 'set_clim', 'set_bands', 'add_north_arrow',
+                    'add_scale_bar', 'add_grid', 'add_colorbar', 'add_raster', 'add_vector',
+                    'add_point_density')
+
+# 不影响出图结果、不参与缓存键计算的构造参数
+_KEY_IGNORED = ('profile', 'headless')
+
+BatchResult = namedtuple('BatchResult', ['index', 'input', 'output', 'error', 'traceback'])
+BatchResult.__doc__ = "单个出图任务的结果。成功时 error 与 traceback 为 None。"
+
+
+class MapTemplate:
+    """
+    可复用的地图模板。
+
+    记录 Map 的构造参数及一系列组件调用，之后可对任意输入数据重放::
+
+        t = MapTemplate(figsize=(8, 8), lazy=True)
+        t.set_cmap('terrain').add_north_arrow(style='nice').add_scale_bar().add_colorbar(label='m')
+        t.render('dem.tif', 'dem.png')
+
+    模板可被 pickle，用于在工作进程中出图。
+    """
+
+    def __init__(self, **map_kwargs):
+        """
+        Args:
+            **map_kwargs: 传递给 Map 构造函数的参数 (figsize, nodata, lazy, dpi, bbox 等)。
+        """
+        self.map_kwargs = map_kwargs
+        self.calls = []
+
+    def __getattr__(self, name):
+        if name not in TEMPLATE_METHODS:
+            raise AttributeError(name)
+
+        def record(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+
+        return record
+
+    def build(self, filepath, **map_overrides):
+        """按模板构建 Map 对象 (已应用全部组件调用)。"""
+        from .plot import Map
+
+        kwargs = dict(self.map_kwargs)
+        kwargs.update(map_overrides)
+        m = Map(filepath, **kwargs)
+        for name, args, call_kwargs in self.calls:
+            getattr(m, name)(*args, **call_kwargs)
+        return m
+
+    def key(self, filepath, **extra):
+        """
+        由输入文件 (路径、修改时间与大小)、构造参数与全部组件调用计算的摘要。
+        输入或样式相同的出图任务得到相同的键。参数中指向已有文件的路径 (如叠加矢量)
+        同样按修改时间与大小计入，文件被原地修改后键随之改变。
+
+        参数只能是 JSON 基本类型 (数值、字符串、列表、元组、字典)、路径或 NumPy 数组，
+        其他对象 (如 Colormap 实例) 没有稳定的表示，会引发 ValueError。
+
+        Args:
+            filepath (str): 输入数据路径。
+            **extra: 其他参与计算的参数 (如 dpi、format)。
+        Returns:
+            str: 十六进制摘要。
+        """
+        from .cache import file_identity
+
+        map_kwargs = {k: v for k, v in self.map_kwargs.items() if k not in _KEY_IGNORED}
+        payload = [os.path.abspath(filepath), file_identity(filepath),
+                   _canonical(map_kwargs), _canonical(self.calls), _canonical(extra)]
+        raw = json.dumps(payload, sort_keys=True).encode('utf-8')
+        return hashlib.sha1(raw).hexdigest()
+
+    def render_bytes(self, filepath, format='png', dpi=None, cache=None, **map_overrides):
+        """
+        按模板以无界面模式出图，返回编码后的图像数据 (bytes)。
+
+        Args:
+            cache (RenderCache): 出图结果缓存 (可选)，命中时不构建图形。
+        """
+        key = None
+        if cache is not None:
+            key = self.key(filepath, format=format, dpi=dpi, overrides=map_overrides)
+            data = cache.get(key)
+            if data is not None:
+                return data
+
+        kwargs = {'headless': True}
+        kwargs.update(map_overrides)
+        with self.build(filepath, **kwargs) as m:
+            data = m.to_bytes(format=format, dpi=dpi)
+        if cache is not None:
+            cache.put(key, data)
+        return data
+
+    def render(self, filepath, output, dpi=None, cache=None, **map_overrides):
+        """
+        按模板以无界面模式出图并保存到 output，保存后释放画布与数据集。
+
+        Args:
+            cache (RenderCache): 出图结果缓存 (可选)，格式由 output 扩展名决定。
+        """
+        if cache is not None:
+            format = os.path.splitext(output)[1][1:].lower() or 'png'
+            data = self.render_bytes(filepath, format=format, dpi=dpi, cache=cache,
+                                     **map_overrides)
+            with open(output, 'wb') as f:
+                f.write(data)
+            return output
+
+        kwargs = {'headless': True}
+        kwargs.update(map_overrides)
+        with self.build(filepath, **kwargs) as m:
+            m.save(output, dpi=dpi)
+        return output
+
+
+def _canonical(value):
+    """将模板参数转换为可稳定序列化的 JSON 结构，文件路径附带文件签名。"""
+    import numpy as np
+    from .cache import file_identity
+
+    if isinstance(value, os.PathLike):
+        value = os.fspath(value)
+    if isinstance(value, str):
+        if os.path.isfile(value):
+            return {'path': os.path.abspath(value), 'files': file_identity(value)}
+        return value
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return {'ndarray': hashlib.sha1(np.ascontiguousarray(value).tobytes()).hexdigest(),
+                'dtype': value.dtype.str, 'shape': list(value.shape)}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    raise ValueError(f"参数无法用于计算缓存键: {type(value).__name__}，请使用数值、字符串或路径。")
+
+
+def render_batch(items, template, processes=None, ordered=True, dpi=None,
+                 maxtasksperchild=50, gdal_cache_mb=256, mp_context=None):
+    """
+    使用进程池 (Agg 后端) 并行出图，逐个产出 BatchResult。
+
+    Args:
+        items (iterable): (输入路径, 输出路径) 序列。
+        template (MapTemplate): 出图模板。
+        processes (int): 工作进程数，默认为 CPU 核数；为 0 时在当前进程中依次出图。
+        ordered (bool): True 按输入顺序产出结果；False 按完成顺序产出 (流式)。
+        dpi (int): 保存 dpi，None 表示使用模板中的 dpi。
+        maxtasksperchild (int): 每个工作进程处理的任务数上限，达到后重启进程以限制内存增长。
+        gdal_cache_mb (int): 每个工作进程的 GDAL 块缓存上限 (MB)。
+        mp_context (str): multiprocessing 启动方式 ('fork', 'spawn', 'forkserver')。
+            使用 'spawn' 或 'forkserver' 时调用方脚本需置于 if __name__ == '__main__' 之下。
+
+    Yields:
+        BatchResult: 单个任务结果，出错时记录异常信息而不会中断其余任务。
+    """
+    tasks = ((i, template, src, dst, dpi) for i, (src, dst) in enumerate(items))
+
+    if processes == 0:
+        for task in tasks:
+            yield _render_task(task)
+        return
+
+    ctx = multiprocessing.get_context(mp_context)
+    with ctx.Pool(processes=processes or os.cpu_count(), initializer=_init_worker,
+                  initargs=(gdal_cache_mb,), maxtasksperchild=maxtasksperchild) as pool:
+        runner = pool.imap if ordered else pool.imap_unordered
+        for result in runner(_render_task, tasks, chunksize=1):
+            yield result
+
+
+def _init_worker(gdal_cache_mb):
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+    if gdal_cache_mb:
+        from osgeo import gdal
+        gdal.SetCacheMax(int(gdal_cache_mb) * 1024 * 1024)
+
+
+def _render_task(task):
+    index, template, src, dst, dpi = task
+    try:
+        template.render(src, dst, dpi=dpi)
+    except Exception as e:
+        return BatchResult(index, src, dst, f"{type(e).__name__}: {e}", traceback.format_exc())
+    return BatchResult(index, src, dst, None, None)
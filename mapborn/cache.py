@@ -0,0 +1,355 @@
+"""
+cache.py
+缓存：矢量图层的磁盘缓存、出图结果缓存，以及按字节预算或按条目数淘汰的内存 LRU 缓存。
+本模块不依赖 GDAL 与 matplotlib，可在出图服务的主进程中轻量导入。
+
+解析并重投影后的几何以 .npy 数组存储，读取时通过内存映射加载，重复渲染几乎没有解析开销。
+"""
+import os
+import glob
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+
+DEFAULT_MAX_BYTES = 1 << 30  # 1 GB
+DEFAULT_RENDER_BYTES = 256 * 1024 * 1024
+
+
+def file_identity(filepath):
+    """文件及其同名附属文件 (.shx/.dbf/.prj 等) 的 (名称, 修改时间, 大小) 列表。"""
+    stem = os.path.splitext(filepath)[0]
+    paths = sorted(set([filepath] + glob.glob(glob.escape(stem) + '.*')))
+    identity = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        identity.append((os.path.basename(path), st.st_mtime_ns, st.st_size))
+    return identity
+
+
+class VectorCache:
+    """
+    矢量几何磁盘缓存。
+
+    每个缓存项是 cache_dir 下的一个子目录，键由源文件路径、修改时间与大小、
+    目标坐标系和简化级别共同决定。读取的数值属性列与几何一并缓存。
+    总大小超过 max_bytes 时按最近访问时间淘汰。
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            cache_dir (str): 缓存目录，不存在时自动创建。
+            max_bytes (int): 缓存目录大小上限 (字节)。默认 1 GB。
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, filepath, target_crs, simplify=None, extra=None):
+        """计算缓存键。源文件 (含 Shapefile 同名附属文件) 变化时键随之改变。"""
+        payload = {
+            'source': os.path.abspath(filepath),
+            'files': file_identity(filepath),
+            'crs': target_crs.ExportToWkt(['FORMAT=WKT2_2018']) if target_crs is not None else None,
+            'simplify': simplify,
+            'extra': extra,
+        }
+        raw = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha1(raw).hexdigest()
+
+    def load(self, key):
+        """读取缓存项，返回以内存映射数组构成的 GeometryBuffer；未命中返回 None。"""
+        from .geometry import GeometryBuffer, ATTRIBUTE_PREFIX
+
+        entry = os.path.join(self.cache_dir, key)
+        if not os.path.isdir(entry):
+            return None
+        names = list(GeometryBuffer.FIELDS)
+        try:
+            names += [f.name[:-4] for f in os.scandir(entry)
+                      if f.name.startswith(ATTRIBUTE_PREFIX) and f.name.endswith('.npy')]
+            arrays = {name: np.load(os.path.join(entry, name + '.npy'), mmap_mode='r')
+                      for name in names}
+        except (OSError, ValueError):
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+        os.utime(entry)
+        return GeometryBuffer.from_arrays(arrays)
+
+    def store(self, key, geoms):
+        """写入缓存项 (先写临时目录再原子替换)，随后按大小上限淘汰旧项。"""
+        entry = os.path.join(self.cache_dir, key)
+        tmp = tempfile.mkdtemp(prefix='.tmp-', dir=self.cache_dir)
+        try:
+            for name, arr in geoms.to_arrays().items():
+                np.save(os.path.join(tmp, name + '.npy'), np.ascontiguousarray(arr))
+            if os.path.isdir(entry):
+                shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self.evict()
+
+    def evict(self):
+        """删除最久未访问的缓存项，直到总大小不超过 max_bytes。"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_dir() or entry.name.startswith('.tmp-'):
+                continue
+            size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+            entries.append((entry.stat().st_mtime, size, entry.path))
+            total += size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_dir():
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+
+class RenderCache:
+    """
+    出图结果缓存，按内容寻址，保存编码后的图像数据 (PNG/PDF 等)。
+
+    键通常由 MapTemplate.key() 计算 (输入文件及其修改时间、NoData、色带与范围、
+    全部组件调用及参数、画布大小、dpi、格式)，命中时直接返回字节，不构建图形。
+
+    - 内存层: 按字节预算淘汰的 LRU。
+    - 磁盘层 (可选): cache_dir 下每项一个文件，总大小超过上限时按最近访问时间淘汰，
+      可在多个进程之间共享。磁盘命中的结果会同时放入内存层。
+    """
+
+    def __init__(self, max_bytes=DEFAULT_RENDER_BYTES, cache_dir=None,
+                 disk_max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            max_bytes (int): 内存层大小上限 (字节)，为 0 时不使用内存层。默认 256 MB。
+            cache_dir (str): 磁盘层目录，None 表示只使用内存层。
+            disk_max_bytes (int): 磁盘层大小上限 (字节)。默认 1 GB。
+        """
+        self.memory = MemoryLRU(max_bytes) if max_bytes else None
+        self.cache_dir = cache_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._disk_bytes = sum(e.stat().st_size for e in self._disk_entries())
+
+    def _disk_entries(self):
+        return [e for e in os.scandir(self.cache_dir)
+                if e.is_file() and not e.name.startswith('.tmp-')]
+
+    def get(self, key):
+        """命中时返回缓存的字节，否则返回 None。"""
+        data = self.memory.get(key) if self.memory is not None else None
+        from_disk = False
+        if data is None and self.cache_dir is not None:
+            path = os.path.join(self.cache_dir, key)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                os.utime(path)
+                from_disk = True
+            except OSError:
+                data = None
+            if data is not None and self.memory is not None:
+                self.memory.put(key, data, len(data))
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.disk_hits += from_disk
+        return data
+
+    def put(self, key, data):
+        """写入缓存项 (磁盘层先写临时文件再原子替换)。"""
+        if self.memory is not None:
+            self.memory.put(key, data, len(data))
+        if self.cache_dir is None:
+            return
+        path = os.path.join(self.cache_dir, key)
+        fd, tmp = tempfile.mkstemp(prefix='.tmp-', dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            try:
+                replaced = os.stat(path).st_size
+            except OSError:
+                replaced = 0
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        with self._lock:
+            self._disk_bytes += len(data) - replaced
+            over = self._disk_bytes > self.disk_max_bytes
+        if over:
+            self.evict()
+
+    def evict(self):
+        """删除磁盘层中最久未访问的缓存项，直到总大小不超过 disk_max_bytes。"""
+        entries = []
+        total = 0
+        for entry in self._disk_entries():
+            st = entry.stat()
+            entries.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+
+    def clear(self):
+        if self.memory is not None:
+            self.memory.clear()
+        if self.cache_dir is not None:
+            for entry in self._disk_entries():
+                os.remove(entry.path)
+        with self._lock:
+            self.hits = self.misses = self.disk_hits = 0
+            self._disk_bytes = 0
+
+    def info(self):
+        """缓存统计 {'hits', 'misses', 'hit_rate', 'disk_hits', 'memory', 'disk_bytes', 'disk_max_bytes'}"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / total if total else 0.0,
+                    'disk_hits': self.disk_hits,
+                    'memory': self.memory.info() if self.memory is not None else None,
+                    'disk_bytes': self._disk_bytes if self.cache_dir is not None else None,
+                    'disk_max_bytes': self.disk_max_bytes if self.cache_dir is not None else None}
+
+
+class MemoryLRU:
+    """
+    按字节预算淘汰的内存 LRU 缓存 (线程安全)。
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()  # key -> (value, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """命中时返回缓存值，否则返回 None。"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value, nbytes):
+        """写入缓存。单项超过预算时不缓存。"""
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._items[key] = (value, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, size) = self._items.popitem(last=False)
+                self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """缓存统计 {'hits', 'misses', 'hit_rate', 'entries', 'bytes', 'max_bytes'}"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / total if total else 0.0,
+                    'entries': len(self._items), 'bytes': self._bytes, 'max_bytes': self.max_bytes}
+
+
+class LRUCache:
+    """
+    按条目数淘汰的内存 LRU 缓存 (线程安全)，用于体积可忽略的小对象 (统计结果、转换对象等)。
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """命中时返回缓存值，否则返回 None。"""
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """写入缓存，超过 maxsize 时淘汰最久未使用的条目。"""
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            self._trim()
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            self._trim()
+
+    def _trim(self):
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """缓存统计 {'hits', 'misses', 'hit_rate', 'size', 'maxsize'}"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / total if total else 0.0,
+                    'size': len(self._items), 'maxsize': self.maxsize}
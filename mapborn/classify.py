@@ -0,0 +1,91 @@
+"""
+classify.py
+分级设色使用的数值分级方法 (向量化实现)。
+"""
+import numpy as np
+
+CLASSIFICATIONS = ('quantiles', 'equal_interval', 'natural_breaks')
+
+# 自然断点的动态规划为 O(k·n²)，数值超过该数量时先等距抽样
+_JENKS_SAMPLE = 1000
+
+
+def class_breaks(values, k=5, method='quantiles'):
+    """
+    计算分级边界。
+
+    Args:
+        values (np.ndarray): 数值数组，NaN 与无穷值被忽略。
+        k (int): 级数。
+        method (str): 分级方法。
+            - 'quantiles': 分位数，各级要素数大致相同 (默认)。
+            - 'equal_interval': 等间距。
+            - 'natural_breaks': 自然断点 (Fisher-Jenks)，使各级的级内离差平方和最小。
+    Returns:
+        np.ndarray: 递增的边界 [最小值, ..., 最大值]，级数为长度减 1。第 i 级为
+            [edges[i], edges[i+1])，最后一级包含最大值。边界重合时级数相应减少。
+    """
+    if method not in CLASSIFICATIONS:
+        raise ValueError(f"不支持的分级方法: {method}，可选 {CLASSIFICATIONS}")
+    if k < 1:
+        raise ValueError(f"级数 k 必须大于 0: {k}")
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        raise ValueError("没有可用于分级的有效数值。")
+
+    lo, hi = values.min(), values.max()
+    if lo == hi:
+        return np.array([lo, hi])
+    if method == 'equal_interval':
+        edges = np.linspace(lo, hi, k + 1)
+    elif method == 'quantiles':
+        edges = np.quantile(values, np.linspace(0, 1, k + 1))
+    else:
+        edges = _natural_breaks(values, k)
+    return np.unique(edges)
+
+
+def _natural_breaks(values, k):
+    """Fisher 最优分级：对排序后的不同值做动态规划，重复值以计数加权。"""
+    if values.size > _JENKS_SAMPLE:
+        values = np.sort(values)
+        values = values[np.linspace(0, values.size - 1, _JENKS_SAMPLE).round().astype(np.int64)]
+    x, w = np.unique(values, return_counts=True)
+    n = len(x)
+    if n <= k:
+        return np.concatenate([x[:1], (x[:-1] + x[1:]) / 2, x[-1:]])
+
+    def prefix(a):
+        out = np.zeros(n + 1)
+        np.cumsum(a, out=out[1:])
+        return out
+
+    W, S, Q = prefix(w), prefix(w * x), prefix(w * x * x)
+    i = np.arange(n)[:, None]
+    j = np.arange(n)[None, :]
+    # cost[i, j]: x[i..j] 作为一级时的离差平方和
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cost = (Q[j + 1] - Q[i]) - (S[j + 1] - S[i]) ** 2 / (W[j + 1] - W[i])
+    cost[np.broadcast_to(i > j, cost.shape)] = np.inf
+
+    total = cost[0]
+    starts = []
+    cols = np.arange(n)
+    for _ in range(1, k):
+        # 末级从 i 开始时，前面各级覆盖 x[0..i-1]
+        prev = np.concatenate([[np.inf], total[:-1]])
+        candidates = prev[:, None] + cost
+        start = candidates.argmin(axis=0)
+        total = candidates[start, cols]
+        starts.append(start)
+
+    # 相邻两级之间的边界取两侧数值的中点，只含一个值的首级或末级也不会与端点重合
+    edges = [x[-1]]
+    end = n - 1
+    for start in reversed(starts):
+        i0 = start[end]
+        edges.append((x[i0 - 1] + x[i0]) / 2)
+        end = i0 - 1
+    edges.append(x[0])
+    return np.array(edges[::-1])
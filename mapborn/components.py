@@ -1,6 +1,5 @@
 import math
 import numpy as np
-import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 from .presets import NORTH_ARROW_STYLES, SCALE_BAR_STYLES, GRID_STYLES
 
@@ -165,14 +164,22 @@ class Graticule(MapComponent):
              interval=None, font_size=None, font_family=None,
              label_sides=['bottom', 'left'],
              label_rotation=0,
-             padding=0.01):
+             padding=0.01, cache=None):
         """
         Args:
             padding (float): 标签距离图廓的间距，相对于地图长宽的比例。
                              例如 0.02 表示 2% 的间距。
+            cache (dict): 经纬线几何缓存 (可选)。坐标系、范围、样式与间隔相同的多幅地图只计算一次。
         """
         style = GRID_STYLES.get(style_name, GRID_STYLES['default'])
-        lon_min, lon_max, lat_min, lat_max = transformer.get_wgs84_bounds(extent)
+        key = (transformer.source_crs.ExportToWkt(), tuple(extent), style_name,
+               tuple(interval) if isinstance(interval, (list, tuple)) else interval)
+        geometry = cache.get(key) if cache is not None else None
+        if geometry is None:
+            geometry = self._geometry(transformer, extent, style, interval)
+            if cache is not None:
+                cache[key] = geometry
+        lons, lats, mer_xs, mer_ys, par_xs, par_ys, lon_precision, lat_precision = geometry
 
         final_font = font_family if font_family else style.get('font_family', 'Arial')
         final_size = font_size if font_size is not None else style['label_size']
@@ -195,40 +202,7 @@ class Graticule(MapComponent):
         pad_x = width_span * padding
         pad_y = height_span * padding
 
-        if interval is not None:
-            if isinstance(interval, (list, tuple)):
-                lon_step, lat_step = interval[0], interval[1]
-            else:
-                lon_step = lat_step = interval
-        else:
-            def get_step(span, n=style.get('density', 4)):
-                raw = span / n
-                if raw == 0: return 1
-                mag = 10 ** math.floor(math.log10(raw))
-                lead = raw / mag
-                if lead < 2: return 1 * mag
-                elif lead < 5: return 2 * mag
-                else: return 5 * mag
-
-            lon_step = get_step(lon_max - lon_min)
-            lat_step = get_step(lat_max - lat_min)
-
-        def get_precision(step):
-            if step >= 1: return 0
-            return max(0, -int(math.floor(math.log10(step))))
-
-        lon_precision = get_precision(lon_step)
-        lat_precision = get_precision(lat_step)
-
-        lons = np.arange(math.floor(lon_min / lon_step) * lon_step, lon_max + lon_step, lon_step)
-        lats = np.arange(math.floor(lat_min / lat_step) * lat_step, lat_max + lat_step, lat_step)
-
-        for lon in lons:
-            if lon < lon_min or lon > lon_max: continue
-            lat_samples = np.linspace(lat_min, lat_max, 50)
-            line_points = [transformer.transform_point_inverse(lon, lat) for lat in lat_samples]
-            xs, ys = zip(*line_points)
-
+        for lon, xs, ys in zip(lons, mer_xs, mer_ys):
             self.ax.plot(xs, ys, color=style['color'], linestyle=style['linestyle'],
                          linewidth=style['linewidth'], alpha=style['alpha'], zorder=5)
 
@@ -256,12 +230,7 @@ class Graticule(MapComponent):
                         rotation=rots['top']
                     )
 
-        for lat in lats:
-            if lat < lat_min or lat > lat_max: continue
-            lon_samples = np.linspace(lon_min, lon_max, 50)
-            line_points = [transformer.transform_point_inverse(lon, lat) for lon in lon_samples]
-            xs, ys = zip(*line_points)
-
+        for lat, xs, ys in zip(lats, par_xs, par_ys):
             self.ax.plot(xs, ys, color=style['color'], linestyle=style['linestyle'],
                          linewidth=style['linewidth'], alpha=style['alpha'], zorder=5)
 
@@ -289,6 +258,52 @@ class Graticule(MapComponent):
                         rotation=rots['right']
                     )
 
+    def _geometry(self, transformer, extent, style, interval):
+        """计算经纬线在地图坐标系中的采样点及标注精度。"""
+        lon_min, lon_max, lat_min, lat_max = transformer.get_wgs84_bounds(extent)
+
+        if interval is not None:
+            if isinstance(interval, (list, tuple)):
+                lon_step, lat_step = interval[0], interval[1]
+            else:
+                lon_step = lat_step = interval
+        else:
+            def get_step(span, n=style.get('density', 4)):
+                raw = span / n
+                if raw == 0: return 1
+                mag = 10 ** math.floor(math.log10(raw))
+                lead = raw / mag
+                if lead < 2: return 1 * mag
+                elif lead < 5: return 2 * mag
+                else: return 5 * mag
+
+            lon_step = get_step(lon_max - lon_min)
+            lat_step = get_step(lat_max - lat_min)
+
+        def get_precision(step):
+            if step >= 1: return 0
+            return max(0, -int(math.floor(math.log10(step))))
+
+        lon_precision = get_precision(lon_step)
+        lat_precision = get_precision(lat_step)
+
+        lons = np.arange(math.floor(lon_min / lon_step) * lon_step, lon_max + lon_step, lon_step)
+        lats = np.arange(math.floor(lat_min / lat_step) * lat_step, lat_max + lat_step, lat_step)
+
+        lons = lons[(lons >= lon_min) & (lons <= lon_max)]
+        lats = lats[(lats >= lat_min) & (lats <= lat_max)]
+
+        # 所有经线/纬线的采样点各用一次批量转换
+        lat_samples = np.linspace(lat_min, lat_max, 50)
+        mer_xs, mer_ys = transformer.transform_points_inverse(
+            np.repeat(lons[:, None], len(lat_samples), axis=1),
+            np.broadcast_to(lat_samples, (len(lons), len(lat_samples))))
+        lon_samples = np.linspace(lon_min, lon_max, 50)
+        par_xs, par_ys = transformer.transform_points_inverse(
+            np.broadcast_to(lon_samples, (len(lats), len(lon_samples))),
+            np.repeat(lats[:, None], len(lon_samples), axis=1))
+        return lons, lats, mer_xs, mer_ys, par_xs, par_ys, lon_precision, lat_precision
+
     def _format_lon(self, val, precision):
         abs_val = abs(val)
         suffix = "E" if val >= 0 else "W"
@@ -1,20 +1,67 @@
+import os
 import sys
+import math
 import numpy as np
 from osgeo import gdal, osr, ogr
+from .geometry import read_layer
+from .utils import transform_extent
+from .cache import MemoryLRU, LRUCache, file_identity
 gdal.UseExceptions()
 ogr.UseExceptions()
 
+_STRIP_PIXELS = 1 << 24     # 流式统计时每次读取的像元数上限
+_HIST_BINS = 4096           # 流式直方图的分箱数
+_HIST_PASSES = 3            # 浮点数据直方图的最多细分次数
+AGGREGATE_METHODS = ('mean', 'max', 'min', 'mode')
+
+# 色带范围统计缓存，键为 (源文件签名, 波段, 参数)
+_STATS_CACHE = LRUCache(maxsize=256)
+
+# 叠加栅格的重投影结果缓存，键为 (源文件, 目标网格, 参数)
+WARP_CACHE = MemoryLRU(max_bytes=512 * 1024 * 1024)
+
 
 class RasterData:
     """
     栅格数据封装类。
+
+    若指定 out_shape，则按显示分辨率读取：读取缓冲区大小由输出像素网格决定，
+    GDAL 会自动选用最接近的金字塔 (overview)，读取耗时与内存只与输出尺寸相关。
+    若指定 window，则只读取该地理范围内的像元。
+    若同时指定 aggregate，则分块读取全分辨率数据，按整数倍块归约到输出网格 (均值、最大值、
+    最小值或众数，NoData 像元不参与计算)，得到的数组与输出像素网格大小相当，不会在绘制时混叠。
+    波段数据均为按需读取：data 首次访问时读取当前波段，其余波段通过 read_band/composite 读取。
     """
 
-    def __init__(self, filepath, nodata=None):
+    def __init__(self, filepath, nodata=None, out_shape=None, window=None, band=1, aggregate=None):
+        """
+        Args:
+            filepath (str): 栅格文件路径。
+            nodata (float): 强制指定的 NoData 值。
+            out_shape (tuple): 输出像素网格 (行, 列)。None 表示按原始分辨率读取。
+            window (list): 读取范围 [xmin, xmax, ymin, ymax]，栅格自身坐标系。
+                None 表示读取整幅栅格。范围会外扩对齐到像元边界。
+            band (int): 读取的波段序号 (从 1 开始)。
+            aggregate (str): 缩小到 out_shape 时的块归约方式 (需同时指定 out_shape)。
+                - None: 由 GDAL 最近邻采样读取 (优先使用金字塔，默认)。
+                - 'mean': 块内有效像元均值，适合连续数据。
+                - 'max' / 'min': 块内最大值 / 最小值。
+                - 'mode': 块内众数，适合分类数据 (土地利用等)。
+        """
+        if aggregate is not None and aggregate not in AGGREGATE_METHODS:
+            raise ValueError(f"不支持的聚合方式: {aggregate}，可选 {AGGREGATE_METHODS}")
         self.filepath = filepath
+        self.aggregate = aggregate
+        self.out_shape = out_shape
+        self.window = window
+        self.band = band
         self._dataset = None
         self._array = None
         self._geotransform = None
+        self._array_geotransform = None
+        self._window = None
+        self._buf_shape = None
+        self._block = 1
         self._projection = None
         self._user_nodata = nodata
         self._file_nodata = None
@@ -41,30 +88,344 @@ class RasterData:
         self._projection.ImportFromWkt(proj_wkt)
 
         self._geotransform = self._dataset.GetGeoTransform()
-        band = self._dataset.GetRasterBand(1)
-        raw_array = band.ReadAsArray()
+        self._check_band(self.band)
+
+        self._window = self._pixel_window(self.window)
+        xoff, yoff, xsize, ysize = self._window
+        self._buf_shape = self._fit_shape(ysize, xsize, self.out_shape)
+        buf_ysize, buf_xsize = self._buf_shape
+        if self.aggregate and (buf_ysize, buf_xsize) != (ysize, xsize):
+            # 整数倍的正方形块，末尾不足一块的部分视为 NoData 补齐
+            f = max(math.ceil(ysize / buf_ysize), math.ceil(xsize / buf_xsize))
+            self._block = f
+            self._buf_shape = buf_ysize, buf_xsize = math.ceil(ysize / f), math.ceil(xsize / f)
+            sx = sy = f
+        else:
+            sx, sy = xsize / buf_xsize, ysize / buf_ysize
+
+        gt = self._geotransform
+        self._array_geotransform = (gt[0] + xoff * gt[1] + yoff * gt[2], gt[1] * sx, gt[2] * sy,
+                                    gt[3] + xoff * gt[4] + yoff * gt[5], gt[4] * sx, gt[5] * sy)
 
-        self._file_nodata = band.GetNoDataValue()
+        self._file_nodata = self._dataset.GetRasterBand(self.band).GetNoDataValue()
         self._final_nodata = self._user_nodata if self._user_nodata is not None else self._file_nodata
 
-        if self._final_nodata is not None:
-            if np.issubdtype(raw_array.dtype, np.floating):
-                self._array = np.ma.masked_values(raw_array, self._final_nodata, copy=False)
-                self._array = np.ma.masked_invalid(self._array)
+    def _check_band(self, band):
+        if not 1 <= band <= self._dataset.RasterCount:
+            raise ValueError(f"波段序号超出范围: {band} (共 {self._dataset.RasterCount} 个波段)\n"
+                             f"文件: {self.filepath}")
+
+    def _band_nodata(self, band):
+        if self._user_nodata is not None:
+            return self._user_nodata
+        return self._dataset.GetRasterBand(band).GetNoDataValue()
+
+    def read_band(self, band, buf_shape=None):
+        """
+        读取指定波段 (受 window 与 out_shape 约束)，返回掩膜数组。
+
+        Args:
+            band (int): 波段序号 (从 1 开始)。
+            buf_shape (tuple): 读取尺寸 (行, 列)，默认为当前输出网格。
+        """
+        self._check_band(band)
+        if self._block > 1 and buf_shape is None:
+            return self._read_aggregated(band)
+        xoff, yoff, xsize, ysize = self._window
+        buf_ysize, buf_xsize = buf_shape or self._buf_shape
+        rb = self._dataset.GetRasterBand(band)
+        if (xoff, yoff, xsize, ysize, buf_xsize, buf_ysize) == \
+                (0, 0, self._dataset.RasterXSize, self._dataset.RasterYSize, xsize, ysize):
+            raw_array = rb.ReadAsArray()
+        else:
+            # 缓冲区小于源窗口时，GDAL 会优先从合适的金字塔层读取
+            raw_array = rb.ReadAsArray(xoff, yoff, xsize, ysize,
+                                       buf_xsize=buf_xsize, buf_ysize=buf_ysize,
+                                       resample_alg=gdal.GRIORA_NearestNeighbour)
+        return _mask_nodata(raw_array, self._band_nodata(band))
+
+    def _read_aggregated(self, band):
+        """按行条带读取全分辨率窗口，逐条带做块归约。峰值内存约为一个条带。"""
+        f = self._block
+        xoff, yoff, xsize, ysize = self._window
+        rows, cols = self._buf_shape
+        nodata = self._band_nodata(band)
+        rb = self._dataset.GetRasterBand(band)
+        strip = _STRIP_PIXELS // 8 if self.aggregate == 'mode' else _STRIP_PIXELS  # 众数需排序，中间数组较大
+        step = max(1, strip // (xsize * f))  # 每个条带的输出行数
+
+        data = mask = None
+        for r0 in range(0, rows, step):
+            r1 = min(r0 + step, rows)
+            y0 = r0 * f
+            h = min(r1 * f, ysize) - y0
+            block = _mask_nodata(rb.ReadAsArray(xoff, yoff + y0, xsize, h), nodata)
+            reduced = _reduce_blocks(block, f, self.aggregate)
+            if data is None:
+                data = np.empty((rows, cols), dtype=reduced.dtype)
+                mask = np.empty((rows, cols), dtype=bool)
+            data[r0:r1] = np.ma.getdata(reduced)
+            mask[r0:r1] = np.ma.getmaskarray(reduced)
+        return np.ma.array(data, mask=mask)
+
+    def sample_band(self, band, max_size=1024):
+        """
+        以不超过 max_size x max_size 的尺寸读取波段 (优先使用金字塔)，返回有效像元的一维数组。
+        用于估计拉伸范围等统计量，避免读取全分辨率数据。
+        """
+        rows, cols = self._buf_shape
+        sample = self.read_band(band, buf_shape=self._fit_shape(rows, cols, (max_size, max_size)))
+        return sample.compressed()
+
+    def composite(self, bands=(1, 2, 3), percentiles=(2, 98), sample_size=1024):
+        """
+        生成 RGB(A) 合成影像。
+
+        各波段依次读取，拉伸范围由采样像元的百分位数估计，结果直接写入一个 uint8 缓冲区，
+        任一波段为 NoData 的像元 alpha 为 0。
+
+        Args:
+            bands (tuple): 依次作为 R、G、B 的波段序号。
+            percentiles (tuple): 线性拉伸的百分位数 (低, 高)。
+            sample_size (int): 估计拉伸范围时的采样尺寸。
+
+        Returns:
+            ndarray: (行, 列, 4) uint8 数组。
+        """
+        if len(bands) != 3:
+            raise ValueError(f"合成影像需要 3 个波段: {bands}")
+        rows, cols = self._buf_shape
+        rgba = np.empty((rows, cols, 4), dtype=np.uint8)
+        valid = np.ones((rows, cols), dtype=bool)
+
+        for i, band in enumerate(bands):
+            sample = self.sample_band(band, max_size=sample_size)
+            lo, hi = np.percentile(sample, percentiles) if sample.size else (0.0, 1.0)
+            scale = 255.0 / (hi - lo) if hi > lo else 0.0
+
+            data = self.read_band(band)
+            valid &= ~np.ma.getmaskarray(data)
+            channel = (np.ma.getdata(data).astype(np.float32) - np.float32(lo)) * np.float32(scale)
+            np.clip(channel, 0, 255, out=channel)
+            rgba[..., i] = channel
+            del data, channel
+
+        rgba[..., 3] = np.where(valid, 255, 0)
+        return rgba
+
+    def _pixel_window(self, window):
+        """将地理范围转换为像元窗口 (xoff, yoff, xsize, ysize)，并裁剪到栅格范围内。"""
+        cols, rows = self._dataset.RasterXSize, self._dataset.RasterYSize
+        if window is None:
+            return 0, 0, cols, rows
+
+        gt = self._geotransform
+        if gt[2] != 0 or gt[4] != 0:
+            raise ValueError(f"带旋转参数的栅格不支持按范围读取。\n文件: {self.filepath}")
+
+        xmin, xmax, ymin, ymax = window
+        px = sorted(((xmin - gt[0]) / gt[1], (xmax - gt[0]) / gt[1]))
+        py = sorted(((ymin - gt[3]) / gt[5], (ymax - gt[3]) / gt[5]))
+        x0, x1 = max(0, math.floor(px[0])), min(cols, math.ceil(px[1]))
+        y0, y1 = max(0, math.floor(py[0])), min(rows, math.ceil(py[1]))
+        if x1 <= x0 or y1 <= y0:
+            raise ValueError(f"读取范围与栅格不相交: {window}\n文件: {self.filepath}")
+        return x0, y0, x1 - x0, y1 - y0
+
+    @staticmethod
+    def _fit_shape(rows, cols, out_shape):
+        """按输出网格等比缩小读取尺寸，只缩小不放大。返回 (行, 列)。"""
+        if out_shape is None:
+            return rows, cols
+        out_rows, out_cols = out_shape
+        scale = max(cols / max(out_cols, 1), rows / max(out_rows, 1))
+        if scale <= 1:
+            return rows, cols
+        return max(1, math.ceil(rows / scale)), max(1, math.ceil(cols / scale))
+
+    def clim(self, mode='percentile', p=(2, 98), k=2.0, band=None, approx=None):
+        """
+        估计色带显示范围 (vmin, vmax)，无需将整幅栅格读入内存。
+
+        Args:
+            mode (str): 估计方式。
+                - 'percentile': 百分位数范围 p，对离群值稳健 (默认)。
+                - 'minmax': 最小值与最大值。
+                - 'std': 均值 ± k 倍标准差。
+            p (tuple): 百分位数 (低, 高)，默认 (2, 98)。
+            k (float): 'std' 模式的标准差倍数。
+            band (int): 波段序号，默认为当前波段。
+            approx (bool): True 使用金字塔/降采样像元估计；False 分块流式读取全分辨率数据；
+                None 表示有金字塔时采样估计，否则流式统计。
+
+        结果按 (文件, 修改时间, 波段, NoData, 读取范围, 参数) 在进程内缓存。
+        'minmax' 与 'std' 在整幅读取时优先使用 GDAL 已缓存的统计信息 (如 .aux.xml)。
+        """
+        band = band or self.band
+        self._check_band(band)
+        rb = self._dataset.GetRasterBand(band)
+        if approx is None:
+            approx = rb.GetOverviewCount() > 0
+
+        key = self._stats_key(band, mode, tuple(p), k, approx)
+        if key is not None:
+            cached = _STATS_CACHE.get(key)
+            if cached is not None:
+                return cached
+
+        if mode == 'percentile':
+            if approx:
+                values = self.sample_band(band, max_size=2048)
+                lo, hi = np.percentile(values, p) if values.size else (np.nan, np.nan)
             else:
-                self._array = np.ma.masked_equal(raw_array, self._final_nodata, copy=False)
+                lo, hi = self._streaming_percentiles(band, p)
+        elif mode in ('minmax', 'std'):
+            stats = self._gdal_statistics(band)
+            if stats is None:
+                if approx:
+                    values = self.sample_band(band, max_size=2048).astype(np.float64)
+                    stats = (values.min(), values.max(), values.mean(), values.std()) \
+                        if values.size else (np.nan,) * 4
+                else:
+                    stats = self._streaming_moments(band)[1:]
+            vmin, vmax, mean, std = stats
+            lo, hi = (vmin, vmax) if mode == 'minmax' else (mean - k * std, mean + k * std)
         else:
-            self._array = np.ma.array(raw_array)
+            raise ValueError(f"未知的色带范围模式: {mode}，可选 'percentile', 'minmax', 'std'")
+
+        result = (float(lo), float(hi))
+        if key is not None:
+            _STATS_CACHE.put(key, result)
+        return result
+
+    def _stats_key(self, band, *params):
+        try:
+            st = os.stat(self.filepath)
+        except OSError:
+            return None  # 非本地文件 (如 /vsicurl/) 不缓存
+        return (os.path.abspath(self.filepath), st.st_mtime_ns, st.st_size, band,
+                self._band_nodata(band), self._window) + params
+
+    def _gdal_statistics(self, band):
+        """GDAL 已缓存的统计信息 (min, max, mean, std)。仅整幅读取且 NoData 与文件一致时可用。"""
+        if self.window is not None:
+            return None
+        rb = self._dataset.GetRasterBand(band)
+        if self._user_nodata is not None and self._user_nodata != rb.GetNoDataValue():
+            return None
+        items = [rb.GetMetadataItem(f'STATISTICS_{name}')
+                 for name in ('MINIMUM', 'MAXIMUM', 'MEAN', 'STDDEV')]
+        if any(item is None for item in items):
+            return None
+        return tuple(float(item) for item in items)
+
+    def _iter_strips(self, band):
+        """按块高度对齐的行条带读取窗口内全分辨率数据，逐条产出有效像元。"""
+        xoff, yoff, xsize, ysize = self._window
+        rb = self._dataset.GetRasterBand(band)
+        nodata = self._band_nodata(band)
+        block_h = max(1, rb.GetBlockSize()[1])
+        rows = max(block_h, _STRIP_PIXELS // max(xsize, 1) // block_h * block_h)
+        for y in range(yoff, yoff + ysize, rows):
+            h = min(rows, yoff + ysize - y)
+            yield _mask_nodata(rb.ReadAsArray(xoff, y, xsize, h), nodata).compressed()
+
+    def _streaming_moments(self, band):
+        """单次流式遍历计算 (count, min, max, mean, std)。"""
+        count, vmin, vmax, total, total_sq = 0, np.inf, -np.inf, 0.0, 0.0
+        for values in self._iter_strips(band):
+            if values.size == 0:
+                continue
+            values = values.astype(np.float64)
+            count += values.size
+            vmin, vmax = min(vmin, values.min()), max(vmax, values.max())
+            total += values.sum()
+            total_sq += np.square(values).sum()
+        if count == 0:
+            return 0, np.nan, np.nan, np.nan, np.nan
+        mean = total / count
+        return count, vmin, vmax, mean, math.sqrt(max(total_sq / count - mean * mean, 0.0))
+
+    def _streaming_percentiles(self, band, p):
+        """
+        流式直方图求百分位数。
+
+        先求取值范围，再按直方图定位百分位数所在分箱；浮点数据对该分箱再细分直方图，
+        最多细分 _HIST_PASSES 次，离群值不会降低主体数据的精度。整数数据按整数值分箱 (精确)。
+        """
+        stats = self._gdal_statistics(band)
+        if stats is not None:
+            vmin, vmax = stats[0], stats[1]
+        else:
+            _, vmin, vmax, _, _ = self._streaming_moments(band)
+        if not np.isfinite(vmin) or vmin == vmax:
+            return vmin, vmax
+
+        rb = self._dataset.GetRasterBand(band)
+        xoff, yoff = self._window[:2]
+        is_int = not np.issubdtype(rb.ReadAsArray(xoff, yoff, 1, 1).dtype, np.floating)
+        exact = is_int and vmax - vmin + 1 <= 4 * _HIST_BINS
+        bins = int(vmax - vmin) + 1 if exact else _HIST_BINS
+
+        # 每个百分位数维护一个搜索区间 [lo, hi) 及区间以下的像元数
+        intervals = [(float(vmin), float(vmax), 0) for _ in p]
+        results = [None] * len(p)
+        total = None
+        for _ in range(1 if exact else _HIST_PASSES):
+            pending = [j for j, r in enumerate(results) if r is None]
+            widths = {j: 1.0 if exact else (intervals[j][1] - intervals[j][0]) / bins for j in pending}
+            hists = {j: np.zeros(bins, dtype=np.int64) for j in pending}
+            for values in self._iter_strips(band):
+                values = values.astype(np.float64)
+                for j in pending:
+                    lo, hi, _ = intervals[j]
+                    sel = values[(values >= lo) & ((values < hi) | (hi == vmax))]
+                    idx = ((sel - lo) / widths[j]).astype(np.int64) if widths[j] > 0 \
+                        else np.zeros(sel.size, dtype=np.int64)
+                    np.clip(idx, 0, bins - 1, out=idx)
+                    hists[j] += np.bincount(idx, minlength=bins)
+            if total is None:
+                total = int(hists[pending[0]].sum())
+
+            for j in pending:
+                lo, hi, below = intervals[j]
+                hist, width = hists[j], widths[j]
+                target = p[j] / 100.0 * (total - 1)
+                cum = below + np.cumsum(hist)
+                i = min(int(np.searchsorted(cum, target, side='right')), bins - 1)
+                before = cum[i - 1] if i > 0 else below
+                if exact:
+                    results[j] = vmin + i
+                elif hist[i] <= 1 or width <= abs(vmax - vmin) * 1e-12:
+                    frac = (target - before) / hist[i] if hist[i] else 0.0
+                    results[j] = lo + (i + frac) * width
+                else:
+                    new_hi = hi if i == bins - 1 else lo + (i + 1) * width
+                    intervals[j] = (lo + i * width, new_hi, before)
+
+        for j, r in enumerate(results):
+            if r is None:
+                lo, hi, below = intervals[j]
+                results[j] = (lo + hi) / 2
+        return tuple(results)
 
     @property
     def data(self):
+        """当前波段的掩膜数组，首次访问时读取。"""
+        if self._array is None:
+            self._array = self.read_band(self.band)
         return self._array
 
+    @property
+    def shape(self):
+        """输出数组形状 (行, 列)，无需读取数据。"""
+        return self._buf_shape
+
     @property
     def extent(self):
         """[xmin, xmax, ymin, ymax]"""
-        gt = self._geotransform
-        rows, cols = self._array.shape
+        gt = self._array_geotransform
+        rows, cols = self._buf_shape
         xmin = gt[0]
         xmax = gt[0] + (cols * gt[1])
         ymax = gt[3]
@@ -75,10 +436,141 @@ class RasterData:
     def crs(self):
         return self._projection
 
+    @property
+    def band_count(self):
+        return self._dataset.RasterCount
+
     def close(self):
         self._dataset = None
 
 
+def warp_to_grid(filepath, dst_crs, extent, shape, band=1, nodata=None, resample='nearest',
+                 use_cache=True, window=None):
+    """
+    将栅格重投影到目标网格 (内存中完成，多线程)，返回掩膜数组。
+
+    结果按 (源文件及其修改时间, 目标坐标系/范围/尺寸, 波段, NoData, 重采样方式) 缓存在
+    WARP_CACHE 中，重复渲染时跳过重投影。
+
+    Args:
+        filepath (str): 源栅格路径。
+        dst_crs: 目标坐标系 (osr.SpatialReference)。
+        extent (list): 目标范围 [xmin, xmax, ymin, ymax]。
+        shape (tuple): 目标网格 (行, 列)。
+        band (int): 源波段序号。
+        nodata (float): 强制指定的源 NoData 值。
+        resample (str): 重采样方式 ('nearest', 'bilinear', 'cubic', 'average', 'mode' 等)。
+        use_cache (bool): 是否使用 WARP_CACHE。
+        window (list): 只使用源栅格该范围内的像元 [xmin, xmax, ymin, ymax]，源栅格坐标系 (可选)。
+            范围以外的目标像元被掩膜。
+    """
+    dst_wkt = dst_crs.ExportToWkt()
+    key = (os.path.abspath(filepath), tuple(file_identity(filepath)), dst_wkt,
+           tuple(float(v) for v in extent), tuple(shape), band, nodata, resample,
+           tuple(float(v) for v in window) if window is not None else None)
+    cached = WARP_CACHE.get(key) if use_cache else None
+    if cached is not None:
+        return cached
+
+    try:
+        src = gdal.Open(filepath, gdal.GA_ReadOnly)
+    except RuntimeError as e:
+        raise FileNotFoundError(f"无法打开栅格文件: {filepath}\nGDAL错误: {str(e)}")
+    if not 1 <= band <= src.RasterCount:
+        raise ValueError(f"波段序号超出范围: {band} (共 {src.RasterCount} 个波段)\n文件: {filepath}")
+    if src.RasterCount > 1 or window is not None:
+        # 以 VRT 选取波段与源窗口，不复制像元
+        options = {'bandList': [band]}
+        if window is not None:
+            options['projWin'] = [window[0], window[3], window[1], window[2]]
+        src = gdal.Translate('', src, format='VRT', **options)
+
+    src_nodata = nodata if nodata is not None else src.GetRasterBand(1).GetNoDataValue()
+    xmin, xmax, ymin, ymax = extent
+    rows, cols = shape
+    warped = gdal.Warp('', src, format='MEM', dstSRS=dst_wkt,
+                       outputBounds=(xmin, ymin, xmax, ymax), width=cols, height=rows,
+                       resampleAlg=resample, srcNodata=src_nodata, dstAlpha=True,
+                       multithread=True, warpOptions=['NUM_THREADS=ALL_CPUS'])
+    raw = warped.GetRasterBand(1).ReadAsArray()
+    alpha = warped.GetRasterBand(2).ReadAsArray()
+    warped = None
+    src = None
+
+    # 超出源数据范围的像元由 alpha 波段标记
+    array = _mask_nodata(raw, src_nodata)
+    array = np.ma.masked_where(alpha == 0, array, copy=False)
+    if use_cache:
+        WARP_CACHE.put(key, array, raw.nbytes + raw.size)
+    return array
+
+
+def _reduce_blocks(array, f, method):
+    """
+    将掩膜数组按 f x f 块归约 (不足一块的边缘按 NoData 补齐)，全部为 NoData 的块被掩膜。
+
+    Args:
+        array: 二维掩膜数组。
+        f (int): 块边长 (像元数)。
+        method (str): 'mean', 'max', 'min' 或 'mode'。
+    """
+    rows, cols = array.shape
+    out_rows, out_cols = -(-rows // f), -(-cols // f)
+    data = np.ma.getdata(array)
+    mask = np.ma.getmaskarray(array)
+    pad = ((0, out_rows * f - rows), (0, out_cols * f - cols))
+    if pad[0][1] or pad[1][1]:
+        data = np.pad(data, pad)
+        mask = np.pad(mask, pad, constant_values=True)
+
+    # (块行, 块列, f*f)
+    def blocks(a):
+        return a.reshape(out_rows, f, out_cols, f).swapaxes(1, 2).reshape(out_rows, out_cols, f * f)
+
+    valid = ~blocks(mask)
+    count = valid.sum(axis=2)
+    empty = count == 0
+    values = blocks(data)
+
+    if method == 'mean':
+        dtype = np.float64 if data.dtype == np.float64 else np.float32
+        total = np.where(valid, values, 0).sum(axis=2, dtype=np.float64)
+        result = (total / np.maximum(count, 1)).astype(dtype)
+    elif method in ('max', 'min'):
+        if np.issubdtype(data.dtype, np.floating):
+            fill = -np.inf if method == 'max' else np.inf
+        else:
+            info = np.iinfo(data.dtype)
+            fill = info.min if method == 'max' else info.max
+        filled = np.where(valid, values, np.array(fill, dtype=data.dtype))
+        result = filled.max(axis=2) if method == 'max' else filled.min(axis=2)
+    elif method == 'mode':
+        # 排序后同值像元相邻，取最长连续段的值；NoData 置为 NaN 排在末尾且不计数
+        s = np.where(valid, values, np.nan).astype(np.float64)
+        s.sort(axis=2)
+        n = f * f
+        idx = np.broadcast_to(np.arange(n), s.shape)
+        starts = np.ones(s.shape, dtype=bool)
+        starts[..., 1:] = s[..., 1:] != s[..., :-1]
+        run_start = np.maximum.accumulate(np.where(starts, idx, 0), axis=2)
+        run_len = np.where(np.isnan(s), 0, idx - run_start + 1)
+        best = run_len.argmax(axis=2)
+        result = np.take_along_axis(s, best[..., None], axis=2)[..., 0]
+        result = np.where(empty, 0, result).astype(data.dtype)
+    else:
+        raise ValueError(f"不支持的聚合方式: {method}，可选 {AGGREGATE_METHODS}")
+    return np.ma.array(result, mask=empty)
+
+
+def _mask_nodata(raw_array, nodata):
+    if nodata is not None:
+        if np.issubdtype(raw_array.dtype, np.floating):
+            array = np.ma.masked_values(raw_array, nodata, copy=False)
+            return np.ma.masked_invalid(array)
+        return np.ma.masked_equal(raw_array, nodata, copy=False)
+    return np.ma.array(raw_array)
+
+
 class VectorData:
     """
     矢量数据封装类
@@ -119,10 +611,38 @@ class VectorData:
     def crs(self):
         return self._crs
 
+    def set_spatial_filter(self, extent, extent_crs=None):
+        """
+        只读取与给定范围相交的要素。
+
+        范围会先转换到图层自身坐标系，过滤由 OGR 在读取时完成 (Arrow 流同样生效)。
+        数据源带有空间索引时 (Shapefile 的 .qix、GPKG 的 R-tree 等) 只访问相交的要素。
+
+        Args:
+            extent (list): [xmin, xmax, ymin, ymax]。None 表示取消过滤。
+            extent_crs: 范围所在坐标系 (osr.SpatialReference)。None 表示与图层相同。
+        """
+        if extent is None:
+            self._layer.SetSpatialFilter(None)
+            return
+
+        xmin, xmax, ymin, ymax = transform_extent(extent, extent_crs, self._crs)
+        self._layer.SetSpatialFilterRect(xmin, ymin, xmax, ymax)
+
+    def read_geometries(self, columns=None):
+        """
+        批量读取全部几何 (受空间过滤约束)，返回列式的 GeometryBuffer。
+
+        Args:
+            columns (list): 同时读取的属性字段，存入 GeometryBuffer.attributes。
+        """
+        return read_layer(self._layer, columns=columns)
+
     @property
     def extent(self):
         """[xmin, xmax, ymin, ymax]"""
         return [self._extent[0], self._extent[1], self._extent[2], self._extent[3]]
 
     def close(self):
+        self._layer = None
         self._ds = None
\ No newline at end of file
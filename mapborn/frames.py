@@ -0,0 +1,199 @@
+"""
+frames.py
+逐帧出图：静态图层只渲染一次，之后每帧仅重绘栅格图像并与静态图层合成。
+"""
+import os
+import inspect
+import itertools
+import subprocess
+import numpy as np
+import matplotlib
+import matplotlib.image as mimage
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+try:
+    from matplotlib._tight_bbox import adjust_bbox
+except ImportError:  # matplotlib < 3.6
+    from matplotlib.tight_bbox import adjust_bbox
+
+_ADJUST_TAKES_RENDERER = 'renderer' in inspect.signature(adjust_bbox).parameters
+
+
+class FrameRenderer:
+    """
+    帧渲染器。
+
+    首次渲染时计算与 savefig(bbox_inches='tight') 相同的紧凑范围，并将除底图图像之外的全部图层
+    (矢量、经纬网、指北针、比例尺、色带、标题等) 以透明背景绘制为 RGBA 缓冲区。
+    之后每帧只绘制图像本身，再与背景色和静态图层做 alpha 合成。
+    两者都按 savefig 的方式将画布调整到紧凑范围后绘制，输出尺寸与像元位置与 Map.save 一致。
+    静态图层发生变化 (包括色带范围) 后需新建渲染器。
+    """
+
+    def __init__(self, fig, image, dpi, pad_inches=0.1):
+        """
+        Args:
+            fig: Figure 对象。
+            image: 每帧更新的 AxesImage。
+            dpi (int): 输出分辨率。
+            pad_inches (float): 紧凑裁剪时的留白，与 Map.save 一致。
+        """
+        self.fig = fig
+        self.image = image
+        self.dpi = dpi
+        self.pad_inches = pad_inches
+        self._overlay = None
+        self._background = None
+        self._bbox = None
+
+    def _with_canvas(self, func):
+        """
+        在 Agg 画布上以指定 dpi 执行 func(canvas)，画布按 savefig 的方式调整到紧凑范围，
+        结束后恢复原画布、范围与 dpi。
+        """
+        fig = self.fig
+        old_canvas, old_dpi = fig.canvas, fig.dpi
+        canvas = old_canvas if isinstance(old_canvas, FigureCanvasAgg) else FigureCanvasAgg(fig)
+        fig.dpi = self.dpi
+        try:
+            if self._bbox is None:
+                canvas.draw()
+                self._bbox = fig.get_tightbbox(canvas.get_renderer()).padded(self.pad_inches)
+            if _ADJUST_TAKES_RENDERER:
+                restore = adjust_bbox(fig, self._bbox, canvas.get_renderer())
+            else:
+                restore = adjust_bbox(fig, self._bbox)
+            try:
+                return func(canvas)
+            finally:
+                restore()
+        finally:
+            fig.dpi = old_dpi
+            if fig.canvas is not old_canvas:
+                fig.set_canvas(old_canvas)
+
+    def _render_static(self, canvas):
+        fig = self.fig
+        patch_visible = fig.patch.get_visible()
+        image_visible = self.image.get_visible()
+        fig.patch.set_visible(False)
+        self.image.set_visible(False)
+        try:
+            canvas.draw()
+            self._overlay = np.array(canvas.buffer_rgba())
+        finally:
+            fig.patch.set_visible(patch_visible)
+            self.image.set_visible(image_visible)
+
+        face = np.array(fig.get_facecolor(), dtype=np.float32)
+        self._background = face[:3] * 255 * face[3] + 255 * (1 - face[3])  # 以白色为底合成背景色
+
+    def _render_image(self, canvas):
+        renderer = canvas.get_renderer()
+        renderer.clear()
+        self.image.draw(renderer)
+        return np.asarray(canvas.buffer_rgba())
+
+    def render(self):
+        """渲染当前帧，返回与 savefig(bbox_inches='tight') 尺寸相同的 (H, W, 4) uint8 数组。"""
+        if self._overlay is None:
+            self._with_canvas(self._render_static)
+        layer = self._with_canvas(self._render_image)
+
+        out = np.empty(layer.shape[:2] + (3,), dtype=np.float32)
+        out[...] = self._background
+        for src in (layer, self._overlay):
+            rgba = src.astype(np.float32)
+            alpha = rgba[..., 3:] / 255.0
+            out *= 1.0 - alpha
+            out += rgba[..., :3] * alpha
+
+        frame = np.empty(out.shape[:2] + (4,), dtype=np.uint8)
+        frame[..., :3] = np.clip(out + 0.5, 0, 255)
+        frame[..., 3] = 255
+        return frame
+
+    def save(self, path):
+        """渲染当前帧并编码保存 (格式由扩展名决定)。"""
+        mimage.imsave(path, self.render(), dpi=self.dpi)
+        return path
+
+
+def write_animation(frames, path, fps=5):
+    """
+    将帧序列流式写出为动画，任意时刻只持有当前帧。
+
+    Args:
+        frames (iterable): (H, W, 4) uint8 数组序列，尺寸需一致。
+        path (str): 输出路径。
+            - 含格式占位符 (如 'out/frame_{:03d}.png')：逐帧保存为图片。
+            - '.gif'：逐帧量化为 256 色 (每帧独立调色板) 后直接追加写入文件。
+            - 其他扩展名 (如 '.mp4')：通过 ffmpeg 管道编码。
+    Returns:
+        int: 写出的帧数。
+    """
+    if '{' in path:
+        count = 0
+        for i, frame in enumerate(frames):
+            mimage.imsave(path.format(i), frame)
+            count += 1
+        return count
+
+    if os.path.splitext(path)[1].lower() == '.gif':
+        return _write_gif(frames, path, fps)
+    return _write_ffmpeg(frames, path, fps)
+
+
+def _write_gif(frames, path, fps):
+    # Image.save(save_all=True) 会先收集全部帧再编码，内存随帧数增长；
+    # 这里用 GifImagePlugin 的逐帧编码接口边编码边写出，只持有当前帧
+    from PIL import Image, GifImagePlugin
+
+    count = 0
+    size = None
+    with open(path, 'wb') as f:
+        for frame in frames:
+            image = Image.fromarray(np.ascontiguousarray(frame[..., :3])).quantize(256)
+            if count == 0:
+                size = image.size
+                header, _ = GifImagePlugin.getheader(image, info={'loop': 0})
+                f.writelines(header)
+            elif image.size != size:
+                raise ValueError("动画各帧尺寸不一致。")
+            f.writelines(GifImagePlugin.getdata(image, duration=int(1000 / fps),
+                                                include_color_table=True))
+            count += 1
+        if count:
+            f.write(b';')  # GIF 结束标记
+    if not count:
+        os.remove(path)
+    return count
+
+
+def _write_ffmpeg(frames, path, fps):
+    it = iter(frames)
+    first = next(it, None)
+    if first is None:
+        return 0
+    h, w = first.shape[:2]
+    cmd = [matplotlib.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error',
+           '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{w}x{h}', '-r', str(fps), '-i', '-',
+           '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p', path]
+    try:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise RuntimeError("未找到 ffmpeg，无法写出视频。可改用 .gif 或逐帧图片输出。")
+
+    count = 0
+    try:
+        for frame in itertools.chain([first], it):
+            if frame.shape[:2] != (h, w):
+                raise ValueError("动画各帧尺寸不一致。")
+            proc.stdin.write(np.ascontiguousarray(frame).tobytes())
+            count += 1
+    finally:
+        proc.stdin.close()
+        err = proc.stderr.read()
+        proc.wait()
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg 编码失败: {err.decode(errors='replace')}")
+    return count
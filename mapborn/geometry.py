@@ -0,0 +1,531 @@
+"""
+geometry.py
+列式几何缓冲区与批量矢量读取。
+
+矢量图层按批次读取为 WKB (优先使用 OGR Arrow 流接口)，再解码为连续的 NumPy
+坐标数组与偏移数组。每个环/线的坐标通过 np.frombuffer 整体解码，不在 Python 中逐顶点处理；
+点图层整批拼接后一次解码，不在 Python 中逐点处理。
+"""
+import struct
+import numpy as np
+from osgeo import ogr
+from .utils import transform_coords
+
+# WKB 几何类型 (去除维度标记后)
+_WKB_POINT = 1
+_WKB_LINESTRING = 2
+_WKB_POLYGON = 3
+_WKB_MULTIPOINT = 4
+_WKB_MULTILINESTRING = 5
+_WKB_MULTIPOLYGON = 6
+_WKB_COLLECTION = 7
+
+DEFAULT_BATCH_SIZE = 65536
+ATTRIBUTE_PREFIX = 'attr.'
+
+
+class GeometryBuffer:
+    """
+    列式几何缓冲区。
+
+    按要素类型分为三组，坐标均为 (N, 2) float64 数组：
+        - 面: poly_coords, ring_offsets (环 -> 顶点), part_offsets (面 -> 环), part_features
+        - 线: line_coords, line_offsets (线 -> 顶点), line_features
+        - 点: point_coords, point_features
+    *_features 记录每个面/线/点所属要素在读取顺序中的序号，用于关联属性。
+    attributes 为按要素序号排列的属性列 {字段名: 数组} (读取时指定 columns 才有)。
+    """
+
+    FIELDS = ('poly_coords', 'ring_offsets', 'part_offsets', 'part_features',
+              'line_coords', 'line_offsets', 'line_features',
+              'point_coords', 'point_features')
+
+    def __init__(self, poly_coords=None, ring_offsets=None, part_offsets=None, part_features=None,
+                 line_coords=None, line_offsets=None, line_features=None,
+                 point_coords=None, point_features=None, attributes=None):
+        self.poly_coords = _coords_or_empty(poly_coords)
+        self.ring_offsets = _offsets_or_empty(ring_offsets)
+        self.part_offsets = _offsets_or_empty(part_offsets)
+        self.part_features = _index_or_empty(part_features)
+        self.line_coords = _coords_or_empty(line_coords)
+        self.line_offsets = _offsets_or_empty(line_offsets)
+        self.line_features = _index_or_empty(line_features)
+        self.point_coords = _coords_or_empty(point_coords)
+        self.point_features = _index_or_empty(point_features)
+        self.attributes = attributes or {}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """由 {字段名: 数组} 构建缓冲区 (数组可以是内存映射)，属性列以 ATTRIBUTE_PREFIX 为前缀。"""
+        attributes = {name[len(ATTRIBUTE_PREFIX):]: values for name, values in arrays.items()
+                      if name.startswith(ATTRIBUTE_PREFIX)}
+        return cls(**{name: arrays[name] for name in cls.FIELDS}, attributes=attributes)
+
+    def to_arrays(self):
+        arrays = {name: getattr(self, name) for name in self.FIELDS}
+        arrays.update((ATTRIBUTE_PREFIX + name, values) for name, values in self.attributes.items())
+        return arrays
+
+    @property
+    def vertex_count(self):
+        return len(self.poly_coords) + len(self.line_coords) + len(self.point_coords)
+
+    @property
+    def feature_count(self):
+        """包含的不同要素数。"""
+        return len(np.unique(np.concatenate([self.part_features, self.line_features,
+                                             self.point_features])))
+
+    def transform(self, coord_trans):
+        """使用 osr.CoordinateTransformation 批量转换全部坐标，返回新的缓冲区。"""
+        return self._with_coords(*(_transform_coords(coord_trans, c) for c in
+                                   (self.poly_coords, self.line_coords, self.point_coords)))
+
+    def _with_coords(self, poly_coords, line_coords, point_coords):
+        return GeometryBuffer(poly_coords, self.ring_offsets, self.part_offsets, self.part_features,
+                              line_coords, self.line_offsets, self.line_features,
+                              point_coords, self.point_features, self.attributes)
+
+    def simplify(self, tolerance):
+        """
+        按网格吸附进行向量化简化，返回新的缓冲区。
+
+        所有顶点吸附到边长为 tolerance 的全局网格，同一环/线中连续落在同一网格点的顶点合并。
+        相邻面的公共边吸附到相同的网格点，因此公共边界保持一致；退化为不足三个点的环被移除
+        (外环退化时整个面移除)。点要素不做处理。
+        """
+        if not tolerance or tolerance <= 0:
+            return self
+        poly = self._simplify_polygons(tolerance)
+        line = self._simplify_lines(tolerance)
+        return GeometryBuffer(*poly, *line, self.point_coords, self.point_features, self.attributes)
+
+    def _simplify_polygons(self, tol):
+        coords, ring_offsets = self.poly_coords, self.ring_offsets
+        if len(coords) == 0:
+            return coords, ring_offsets, self.part_offsets, self.part_features
+        snapped, keep = _snap_runs(coords, ring_offsets, tol)
+
+        ring_starts = ring_offsets[:-1]
+        new_sizes = np.add.reduceat(keep, ring_starts)
+        ring_ok = new_sizes >= 4
+        part_counts = np.diff(self.part_offsets)
+        part_ok = ring_ok[self.part_offsets[:-1]]
+        ring_ok &= np.repeat(part_ok, part_counts)
+
+        keep &= np.repeat(ring_ok, np.diff(ring_offsets))
+        new_ring_offsets = np.zeros(ring_ok.sum() + 1, dtype=np.int64)
+        np.cumsum(new_sizes[ring_ok], out=new_ring_offsets[1:])
+        new_part_counts = np.add.reduceat(ring_ok, self.part_offsets[:-1])[part_ok]
+        new_part_offsets = np.zeros(len(new_part_counts) + 1, dtype=np.int64)
+        np.cumsum(new_part_counts, out=new_part_offsets[1:])
+        return snapped[keep], new_ring_offsets, new_part_offsets, self.part_features[part_ok]
+
+    def _simplify_lines(self, tol):
+        coords, offsets = self.line_coords, self.line_offsets
+        if len(coords) == 0:
+            return coords, offsets, self.line_features
+        snapped, keep = _snap_runs(coords, offsets, tol)
+        new_offsets = np.zeros(len(offsets), dtype=np.int64)
+        np.cumsum(np.add.reduceat(keep, offsets[:-1]), out=new_offsets[1:])
+        return snapped[keep], new_offsets, self.line_features
+
+    def select(self, extent):
+        """
+        只保留外包矩形与 extent [xmin, xmax, ymin, ymax] 相交的面、线与点，返回新的缓冲区。
+        各部分的外包矩形通过 reduceat 向量化计算，属性列保持不变。
+        """
+        xmin, xmax, ymin, ymax = extent
+
+        def hit(coords, starts):
+            if len(starts) < 2:
+                return np.zeros(0, dtype=bool)
+            lo = np.minimum.reduceat(coords, starts[:-1])
+            hi = np.maximum.reduceat(coords, starts[:-1])
+            return (hi[:, 0] >= xmin) & (lo[:, 0] <= xmax) & (hi[:, 1] >= ymin) & (lo[:, 1] <= ymax)
+
+        def offsets(sizes):
+            out = np.zeros(len(sizes) + 1, dtype=np.int64)
+            np.cumsum(sizes, out=out[1:])
+            return out
+
+        part_ok = hit(self.poly_coords, self.ring_offsets[self.part_offsets])
+        ring_ok = np.repeat(part_ok, np.diff(self.part_offsets))
+        ring_sizes = np.diff(self.ring_offsets)
+        line_ok = hit(self.line_coords, self.line_offsets)
+        line_sizes = np.diff(self.line_offsets)
+        p = self.point_coords
+        point_ok = (p[:, 0] >= xmin) & (p[:, 0] <= xmax) & (p[:, 1] >= ymin) & (p[:, 1] <= ymax)
+        return GeometryBuffer(
+            self.poly_coords[np.repeat(ring_ok, ring_sizes)], offsets(ring_sizes[ring_ok]),
+            offsets(np.diff(self.part_offsets)[part_ok]), self.part_features[part_ok],
+            self.line_coords[np.repeat(line_ok, line_sizes)], offsets(line_sizes[line_ok]),
+            self.line_features[line_ok],
+            p[point_ok], self.point_features[point_ok], self.attributes)
+
+    def polygon_paths(self):
+        """每个面生成一个 Path，环的起止编码通过偏移数组向量化生成。"""
+        from matplotlib.path import Path
+
+        if len(self.part_offsets) < 2:
+            return []
+        codes = np.full(len(self.poly_coords), Path.LINETO, dtype=Path.code_type)
+        codes[self.ring_offsets[:-1]] = Path.MOVETO
+        codes[self.ring_offsets[1:] - 1] = Path.CLOSEPOLY
+        starts = self.ring_offsets[self.part_offsets]
+        coords = self.poly_coords
+        return [Path(coords[a:b], codes[a:b]) for a, b in zip(starts[:-1], starts[1:])]
+
+    def line_segments(self):
+        """每条线返回一个 (n, 2) 坐标视图，可直接传入 LineCollection。"""
+        if len(self.line_offsets) < 2:
+            return []
+        return np.split(self.line_coords, self.line_offsets[1:-1])
+
+
+def draw_geometries(ax, geoms, values=None, cmap=None, norm=None, **kwargs):
+    """
+    将 GeometryBuffer 绘制到坐标轴：面为一个 PatchCollection，线为一个 LineCollection，点为散点。
+
+    给出 values (按要素序号排列的数值) 时按 cmap/norm 逐要素着色：各集合只设置一次数值数组，
+    颜色在绘制时整体映射，NaN 使用色带的 bad 颜色。返回创建的图形对象列表。
+    """
+    import matplotlib.patches as mpatches
+    from matplotlib.collections import PatchCollection, LineCollection
+
+    def mapped(features):
+        return np.ma.masked_invalid(values[features])
+
+    artists = []
+    paths = geoms.polygon_paths()
+    if paths:
+        patches = [mpatches.PathPatch(path) for path in paths]
+        collection = PatchCollection(patches, match_original=False, **kwargs)
+        if values is not None:
+            collection.set_array(mapped(geoms.part_features))
+            collection.set_cmap(cmap)
+            collection.set_norm(norm)
+        ax.add_collection(collection)
+        artists.append(collection)
+
+    lines = geoms.line_segments()
+    if lines:
+        lc = LineCollection(lines, **kwargs)
+        if values is not None:
+            lc.set_array(mapped(geoms.line_features))
+            lc.set_cmap(cmap)
+            lc.set_norm(norm)
+        ax.add_collection(lc)
+        artists.append(lc)
+
+    if len(geoms.point_coords):
+        if values is not None:
+            kwargs = dict(kwargs, c=mapped(geoms.point_features), cmap=cmap, norm=norm,
+                          plotnonfinite=True)
+        artists.append(ax.scatter(geoms.point_coords[:, 0], geoms.point_coords[:, 1], **kwargs))
+    return artists
+
+
+class _GeometryBuilder:
+    """将 WKB 解码结果累积为 GeometryBuffer。"""
+
+    def __init__(self):
+        self.rings = []
+        self.ring_sizes = []
+        self.part_ring_counts = []
+        self.part_features = []
+        self.lines = []
+        self.line_features = []
+        self.points = []
+        self.point_features = []
+
+    def add_batch(self, batch, first_index):
+        """添加一批 WKB，第 i 个属于要素 first_index + i。整批为同一种点类型时一次解码。"""
+        if self._add_points(batch, first_index):
+            return
+        for i, wkb in enumerate(batch):
+            self.add_wkb(wkb, first_index + i)
+
+    def _add_points(self, batch, first_index):
+        """
+        点图层的快速路径：各 WKB 长度相同时拼接后以结构化 dtype 整体解码
+        (字节序, 类型, 坐标)。存在其他类型、大端序或 EWKB SRID 时返回 False，由通用解析处理。
+        """
+        wkbs = [wkb for wkb in batch if wkb is not None]
+        if not wkbs:
+            return False
+        size = len(wkbs[0])
+        ndim, rest = divmod(size - 5, 8)
+        if rest or not 2 <= ndim <= 4:
+            return False
+        raw = b''.join(wkbs)
+        if len(raw) != size * len(wkbs):
+            return False
+        records = np.frombuffer(raw, dtype=np.dtype([('order', 'u1'), ('type', '<u4'),
+                                                     ('coords', '<f8', (ndim,))]))
+        gtype = records['type']
+        iso = gtype & 0x0FFFFFFF
+        dim = iso // 1000
+        dims = 2 + ((gtype & 0x80000000 != 0) | (dim == 1) | (dim == 3)) + \
+            ((gtype & 0x40000000 != 0) | (dim == 2) | (dim == 3))
+        if not ((records['order'] == 1) & (iso % 1000 == _WKB_POINT) &
+                (gtype & 0x20000000 == 0) & (dims == ndim)).all():
+            return False
+
+        features = np.arange(first_index, first_index + len(batch), dtype=np.int64)
+        if len(wkbs) != len(batch):
+            features = features[[wkb is not None for wkb in batch]]
+        xy = records['coords'][:, :2]
+        valid = ~np.isnan(xy).any(axis=1)  # 空点 (POINT EMPTY) 的坐标为 NaN
+        self.points.append(np.ascontiguousarray(xy[valid]))
+        self.point_features.append(features[valid])
+        return True
+
+    def add_wkb(self, wkb, feature_index):
+        if wkb is None:
+            return
+        buf = memoryview(wkb).cast('B')
+        if len(buf) == 0:
+            return
+        mark = (len(self.rings), len(self.part_ring_counts), len(self.lines), len(self.points))
+        try:
+            self._parse(buf, 0, feature_index)
+        except (ValueError, struct.error):
+            # 无法解析的几何 (如曲线类型) 整体跳过，回滚该要素已写入的部分
+            self._rollback(*mark)
+
+    def _rollback(self, n_rings, n_parts, n_lines, n_points):
+        del self.rings[n_rings:], self.ring_sizes[n_rings:]
+        del self.part_ring_counts[n_parts:], self.part_features[n_parts:]
+        del self.lines[n_lines:], self.line_features[n_lines:]
+        del self.points[n_points:], self.point_features[n_points:]
+
+    def _parse(self, buf, pos, fid):
+        endian = '<' if buf[pos] == 1 else '>'
+        gtype = struct.unpack_from(endian + 'I', buf, pos + 1)[0]
+        pos += 5
+        has_z = bool(gtype & 0x80000000)
+        has_m = bool(gtype & 0x40000000)
+        if gtype & 0x20000000:  # EWKB SRID
+            pos += 4
+        gtype &= 0x0FFFFFFF
+        base, dim = gtype % 1000, gtype // 1000
+        ndim = 2 + int(has_z or dim in (1, 3)) + int(has_m or dim in (2, 3))
+        dtype = np.dtype(endian + 'f8')
+
+        if base == _WKB_POINT:
+            xy = np.frombuffer(buf, dtype=dtype, count=ndim, offset=pos)[:2]
+            if not np.isnan(xy).any():
+                self.points.append(xy)
+                self.point_features.append(fid)
+            return pos + ndim * 8
+
+        if base == _WKB_LINESTRING:
+            coords, pos = _read_coords(buf, pos, endian, dtype, ndim)
+            if len(coords) >= 2:
+                self.lines.append(coords)
+                self.line_features.append(fid)
+            return pos
+
+        if base == _WKB_POLYGON:
+            n_rings = struct.unpack_from(endian + 'I', buf, pos)[0]
+            pos += 4
+            kept = 0
+            for _ in range(n_rings):
+                coords, pos = _read_coords(buf, pos, endian, dtype, ndim)
+                if len(coords) >= 3:
+                    self.rings.append(coords)
+                    self.ring_sizes.append(len(coords))
+                    kept += 1
+            if kept:
+                self.part_ring_counts.append(kept)
+                self.part_features.append(fid)
+            return pos
+
+        if base in (_WKB_MULTIPOINT, _WKB_MULTILINESTRING, _WKB_MULTIPOLYGON, _WKB_COLLECTION):
+            n_geoms = struct.unpack_from(endian + 'I', buf, pos)[0]
+            pos += 4
+            for _ in range(n_geoms):
+                pos = self._parse(buf, pos, fid)
+            return pos
+
+        raise ValueError(f"不支持的 WKB 几何类型: {gtype}")
+
+    def build(self):
+        def concat(arrays):
+            return np.concatenate(arrays).astype(np.float64, copy=False) if arrays else None
+
+        def offsets(sizes):
+            out = np.zeros(len(sizes) + 1, dtype=np.int64)
+            np.cumsum(sizes, out=out[1:])
+            return out
+
+        return GeometryBuffer(
+            poly_coords=concat(self.rings),
+            ring_offsets=offsets(self.ring_sizes),
+            part_offsets=offsets(self.part_ring_counts),
+            part_features=self.part_features,
+            line_coords=concat(self.lines),
+            line_offsets=offsets([len(c) for c in self.lines]),
+            line_features=self.line_features,
+            # 逐个解析的点为 (2,) 数组与整数，整批解码的点为 (n, 2) 数组与序号数组
+            point_coords=np.vstack(self.points) if self.points else None,
+            point_features=np.hstack(self.point_features) if self.point_features else None,
+        )
+
+
+def read_layer(layer, batch_size=DEFAULT_BATCH_SIZE, columns=None):
+    """
+    批量读取 OGR 图层的全部几何，返回 GeometryBuffer。
+
+    Args:
+        layer: OGR Layer 对象 (会被重置读取位置，已设置的过滤条件依然生效)。
+        batch_size (int): 每批读取的要素数。
+        columns (list): 同时读取的属性字段，结果存入 GeometryBuffer.attributes。
+            数值字段为 float64 数组 (空值为 NaN)，其余字段为 object 数组。
+    """
+    builder = _GeometryBuilder()
+    feature_index = 0
+    chunks = {name: [] for name in columns or ()}
+    for batch, attrs in _iter_batches(layer, batch_size, tuple(columns or ())):
+        builder.add_batch(batch, feature_index)
+        feature_index += len(batch)
+        for name in chunks:
+            chunks[name].append(attrs[name])
+    geoms = builder.build()
+    if columns:
+        defn = layer.GetLayerDefn()
+        geoms.attributes = {name: _column_array(defn, name, values)
+                            for name, values in chunks.items()}
+    return geoms
+
+
+def _iter_batches(layer, batch_size, columns):
+    """
+    按批次产出 (WKB 列表, {字段名: 值序列})，只读取几何与 columns 中的字段。
+    优先使用 Arrow 流接口 (GDAL >= 3.6)，否则逐要素导出 WKB。
+    """
+    defn = layer.GetLayerDefn()
+    names = [defn.GetFieldDefn(i).GetName() for i in range(defn.GetFieldCount())]
+    missing = [name for name in columns if name not in names]
+    if missing:
+        raise ValueError(f"字段不存在: {', '.join(missing)} (可用字段: {', '.join(names)})")
+    layer.SetIgnoredFields([name for name in names if name not in columns])
+    try:
+        batches = _iter_arrow_batches(layer, batch_size, columns)
+        if batches is None:
+            batches = _iter_feature_batches(layer, batch_size, columns)
+        for batch in batches:
+            yield batch
+    finally:
+        layer.SetIgnoredFields([])
+        layer.ResetReading()
+
+
+def _filled_objects(values):
+    """掩膜数组的被掩膜元素替换为 None (np.ma.filled 不能以 None 填充)。"""
+    if not isinstance(values, np.ma.MaskedArray):
+        return values
+    mask = np.ma.getmaskarray(values)
+    values = np.ma.getdata(values).astype(object)
+    values[mask] = None
+    return values
+
+
+def _column_array(defn, name, chunks):
+    field_type = defn.GetFieldDefn(defn.GetFieldIndex(name)).GetType()
+    # 逐要素读取时空值为 None，Arrow 流中为掩膜数组的被掩膜元素，两者都转换为 NaN / None
+    if field_type in (ogr.OFTInteger, ogr.OFTInteger64, ogr.OFTReal):
+        parts = [np.array([np.nan if v is None else v for v in c], dtype=np.float64)
+                 if isinstance(c, list) else np.ma.filled(np.ma.asarray(c).astype(np.float64), np.nan)
+                 for c in chunks]
+    else:
+        # Arrow 流中的字符串为 bytes
+        parts = [np.array([v.decode('utf-8') if isinstance(v, bytes) else v
+                           for v in (c if isinstance(c, list) else _filled_objects(c))], dtype=object)
+                 for c in chunks]
+    if not parts:
+        return np.empty(0, dtype=np.float64)
+    return np.concatenate(parts)
+
+
+def _iter_arrow_batches(layer, batch_size, columns=()):
+    if not hasattr(layer, 'GetArrowStreamAsNumPy'):
+        return None
+    layer.ResetReading()
+    try:
+        stream = layer.GetArrowStreamAsNumPy(options=[
+            'INCLUDE_FID=NO', f'MAX_FEATURES_IN_BATCH={batch_size}', 'USE_MASKED_ARRAYS=YES'])
+        first = stream.GetNextRecordBatch()
+    except RuntimeError:
+        return None
+
+    geom_name = layer.GetGeometryColumn() or 'wkb_geometry'
+    if first is not None and any(name not in first for name in (geom_name,) + tuple(columns)):
+        return None
+
+    def gen():
+        batch = first
+        while batch is not None:
+            # 可为空的列以掩膜数组返回，空值由 _column_array 统一转换
+            yield _filled_objects(batch[geom_name]), {name: batch[name] for name in columns}
+            batch = stream.GetNextRecordBatch()
+
+    return gen()
+
+
+def _iter_feature_batches(layer, batch_size, columns=()):
+    layer.ResetReading()
+    return _feature_batches(layer, batch_size, columns)
+
+
+def _feature_batches(features, batch_size, columns):
+    batch = []
+    attrs = {name: [] for name in columns}
+    for feature in features:
+        geom = feature.GetGeometryRef()
+        batch.append(geom.ExportToIsoWkb(ogr.wkbNDR) if geom is not None else None)
+        for name in columns:
+            attrs[name].append(feature.GetField(name))
+        if len(batch) >= batch_size:
+            yield batch, attrs
+            batch = []
+            attrs = {name: [] for name in columns}
+    if batch:
+        yield batch, attrs
+
+
+def _snap_runs(coords, offsets, tol):
+    """吸附到网格并标记需要保留的顶点：每段的首尾顶点，以及与前一顶点不在同一网格点的顶点。"""
+    grid = np.round(coords / tol)
+    keep = np.ones(len(coords), dtype=bool)
+    keep[1:] = (grid[1:] != grid[:-1]).any(axis=1)
+    keep[offsets[:-1]] = True
+    keep[offsets[1:] - 1] = True
+    return grid * tol, keep
+
+
+def _read_coords(buf, pos, endian, dtype, ndim):
+    n = struct.unpack_from(endian + 'I', buf, pos)[0]
+    pos += 4
+    coords = np.frombuffer(buf, dtype=dtype, count=n * ndim, offset=pos).reshape(n, ndim)[:, :2]
+    return coords, pos + n * ndim * 8
+
+
+def _transform_coords(coord_trans, coords):
+    if coord_trans is None or len(coords) == 0:
+        return coords
+    xs, ys = transform_coords(coord_trans, coords[:, 0], coords[:, 1])
+    return np.column_stack([xs, ys])
+
+
+def _coords_or_empty(coords):
+    return np.empty((0, 2), dtype=np.float64) if coords is None else np.asarray(coords, dtype=np.float64)
+
+
+def _offsets_or_empty(offsets):
+    return np.zeros(1, dtype=np.int64) if offsets is None else np.asarray(offsets, dtype=np.int64)
+
+
+def _index_or_empty(index):
+    return np.empty(0, dtype=np.int64) if index is None else np.asarray(index, dtype=np.int64)
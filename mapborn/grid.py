@@ -0,0 +1,280 @@
+"""
+grid.py
+多子图地图 (small multiples)：同一区域的多幅栅格排列在一张图中，共享叠加图层、坐标转换与整饰。
+"""
+import io
+import math
+from .utils import GeoTransformer
+from .axes import add_styled_colorbar
+from .profiling import make_profiler
+
+
+class SharedState:
+    """
+    多个 Map 之间共享的只读数据，由 MapGrid 创建并传给各子图。
+
+    - transformers: 按坐标系复用的 GeoTransformer。
+    - geometries: 已解析 (并重投影、简化) 的叠加矢量几何，按 (路径, 目标坐标系, 裁剪范围, 简化容差, 属性列) 索引。
+    - graticules: 经纬网的经纬线几何，按 (坐标系, 范围, 样式, 间隔) 索引。
+    """
+
+    def __init__(self):
+        self.transformers = []
+        self.geometries = {}
+        self.graticules = {}
+
+    def transformer(self, crs):
+        """返回与 crs 相同坐标系的 GeoTransformer，没有时创建。"""
+        for known, transformer in self.transformers:
+            if known.IsSame(crs):
+                return transformer
+        transformer = GeoTransformer(crs)
+        self.transformers.append((crs, transformer))
+        return transformer
+
+
+class MapGrid:
+    """
+    多子图地图容器。
+
+    各子图是一个 Map，按行优先顺序排列。叠加矢量只解析一次供所有子图使用，经纬网几何与
+    坐标转换器同样共享，N 幅子图的耗时接近一幅子图的加载耗时加上 N 次图像绘制::
+
+        with MapGrid(['ssp126.tif', 'ssp245.tif', 'ssp585.tif'], ncols=3,
+                     titles=['SSP1-2.6', 'SSP2-4.5', 'SSP5-8.5'], headless=True) as grid:
+            grid.set_cmap('RdYlBu_r')
+            grid.add_vector('boundary.shp', fc='none', ec='black', lw=0.5)
+            grid.add_grid(label_sides=['bottom'])
+            grid.add_colorbar(label='°C', location='bottom')
+            grid.save('scenarios.png')
+
+    grid[i] 返回第 i 幅子图的 Map，可单独添加组件。
+    """
+
+    def __init__(self, sources, nrows=None, ncols=None, figsize=None, dpi=300, titles=None,
+                 share_clim=True, wspace=0.05, hspace=0.1, profile=False, headless=False,
+                 **map_kwargs):
+        """
+        Args:
+            sources (list): 各子图的数据路径。
+            nrows (int): 行数。与 ncols 均为 None 时按接近正方形的方式排列。
+            ncols (int): 列数。
+            figsize (tuple): 画布大小 (宽, 高)，单位英寸。默认每幅子图 4 x 4 英寸。
+            dpi (int): 输出分辨率。
+            titles (list): 各子图标题 (可选)。
+            share_clim (bool): 是否所有子图使用统一的色带范围 (取各子图范围的并集)。默认 True。
+            wspace (float): 子图水平间距 (相对子图宽度)。
+            hspace (float): 子图垂直间距 (相对子图高度)。
+            profile (bool/str/callable/Profiler): 分阶段性能统计，所有子图共用一个统计器。
+            headless (bool): 无界面模式，见 Map。
+            **map_kwargs: 传给每个 Map 的其他参数 (nodata, lazy, bbox, aggregate 等)。
+        """
+        from .plot import Map
+
+        sources = list(sources)
+        if not sources:
+            raise ValueError("sources 不能为空。")
+        n = len(sources)
+        if nrows is None and ncols is None:
+            ncols = math.ceil(math.sqrt(n))
+        if ncols is None:
+            ncols = math.ceil(n / nrows)
+        if nrows is None:
+            nrows = math.ceil(n / ncols)
+        if nrows * ncols < n:
+            raise ValueError(f"{nrows} x {ncols} 的网格放不下 {n} 幅子图。")
+        if figsize is None:
+            figsize = (4 * ncols, 4 * nrows)
+
+        self.headless = headless
+        self.dpi = dpi
+        self._closed = False
+        if headless:
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+            self.fig = Figure(figsize=figsize)
+            FigureCanvasAgg(self.fig)
+        else:
+            import matplotlib.pyplot as plt
+
+            self.fig = plt.figure(figsize=figsize)
+        axes = self.fig.subplots(nrows, ncols, squeeze=False,
+                                 gridspec_kw={'wspace': wspace, 'hspace': hspace}).ravel()
+        for ax in axes[n:]:
+            ax.axis('off')
+
+        self.profiler = make_profiler(profile)
+        self.shared = SharedState()
+        self.panels = []
+        try:
+            for source, ax in zip(sources, axes):
+                self.panels.append(Map(source, dpi=dpi, ax=ax, shared=self.shared,
+                                       profile=self.profiler, headless=headless, **map_kwargs))
+        except BaseException:
+            # 任一子图加载失败时释放画布与已打开的子图
+            self.close()
+            raise
+        if titles is not None:
+            for panel, title in zip(self.panels, titles):
+                panel.set_title(title, fontsize=12)
+        if share_clim:
+            self.set_clim()
+
+    def __len__(self):
+        return len(self.panels)
+
+    def __iter__(self):
+        return iter(self.panels)
+
+    def __getitem__(self, index):
+        return self.panels[index]
+
+    def _select(self, panels):
+        if panels is None:
+            return self.panels
+        return [self.panels[i] for i in panels]
+
+    def set_title(self, title, fontsize=16, fontfamily=None):
+        """设置整幅图的总标题。"""
+        kwargs = {'fontsize': fontsize}
+        if fontfamily:
+            kwargs['fontfamily'] = fontfamily
+        self.fig.suptitle(title, **kwargs)
+
+    def set_cmap(self, cmap_name):
+        """设置所有栅格子图的色带。"""
+        for panel in self.panels:
+            panel.set_cmap(cmap_name)
+
+    def set_clim(self, vmin=None, vmax=None, mode=None, p=(2, 98), k=2.0, approx=None):
+        """
+        为所有栅格子图设置统一的色带范围。
+
+        未给出的 vmin/vmax 取各子图范围的并集：给出 mode 时按 Map.set_clim 的方式逐幅统计，
+        否则使用各子图当前的范围。参数含义见 Map.set_clim。
+        """
+        images = [panel for panel in self.panels if panel._image_handle is not None]
+        if not images:
+            return
+        if vmin is None or vmax is None:
+            if mode is not None:
+                lims = [panel.base_data.clim(mode=mode, p=p, k=k, approx=approx) for panel in images]
+            else:
+                lims = [panel._image_handle.get_clim() for panel in images]
+            vmin = min(lo for lo, _ in lims) if vmin is None else vmin
+            vmax = max(hi for _, hi in lims) if vmax is None else vmax
+        for panel in images:
+            panel.set_clim(vmin=vmin, vmax=vmax)
+
+    def add_vector(self, filepath, panels=None, **kwargs):
+        """
+        在子图上叠加矢量图层，文件只解析一次。
+
+        Args:
+            filepath (str): 矢量文件路径。
+            panels (list): 子图序号 (可选)，默认全部子图。
+            **kwargs: 传给 Map.add_vector 的参数。
+        """
+        for panel in self._select(panels):
+            panel.add_vector(filepath, **kwargs)
+
+    def add_grid(self, panels=None, **kwargs):
+        """添加经纬网，同一范围的子图共用经纬线几何。参数见 Map.add_grid。"""
+        for panel in self._select(panels):
+            panel.add_grid(**kwargs)
+
+    def add_north_arrow(self, panels=(0,), **kwargs):
+        """添加指北针，默认只加在第一幅子图上。参数见 Map.add_north_arrow。"""
+        for panel in self._select(panels):
+            panel.add_north_arrow(**kwargs)
+
+    def add_scale_bar(self, panels=(0,), **kwargs):
+        """添加比例尺，默认只加在第一幅子图上。参数见 Map.add_scale_bar。"""
+        for panel in self._select(panels):
+            panel.add_scale_bar(**kwargs)
+
+    def add_colorbar(self, location='right', width="3%", pad="2%", extend='neither',
+                     label="", label_size=12, tick_size=10, color='black',
+                     font_family='Arial', mappable=None):
+        """
+        为所有子图添加一条共享色带，占用各子图同侧的空间。
+        色带对应第一幅栅格子图，子图应使用统一的色带范围 (share_clim=True 或 set_clim)。
+        参数见 Map.add_colorbar。
+        """
+        if mappable is None:
+            handles = [panel._image_handle for panel in self.panels
+                       if panel._image_handle is not None and panel.bands is None]
+            if not handles:
+                print("警告: 子图中没有单波段栅格，无法添加色带。")
+                return
+            mappable = handles[0]
+        for panel in self.panels:
+            panel._frame_renderer = None
+        with self.profiler.stage('colorbar'):
+            return add_styled_colorbar(
+                fig=self.fig,
+                mappable=mappable,
+                ax=[panel.ax for panel in self.panels],
+                location=location,
+                width=width,
+                pad=pad,
+                extend=extend,
+                label=label,
+                label_size=label_size,
+                tick_size=tick_size,
+                color=color,
+                font_family=font_family
+            )
+
+    def show(self):
+        """显示交互式绘图窗口。"""
+        if self.headless:
+            raise ValueError("无界面模式 (headless=True) 下无法显示窗口，请使用 save()。")
+        import matplotlib.pyplot as plt
+
+        plt.show()
+
+    def save(self, path, dpi=None, format=None):
+        """
+        保存整幅图。
+
+        Args:
+            path (str/file): 输出路径或可写的文件对象。
+            dpi (int): 分辨率，默认使用初始化时的 dpi。
+            format (str): 输出格式。None 表示由扩展名决定。
+        """
+        dpi = dpi or self.dpi
+        for panel in self.panels:
+            panel._reload_for_dpi(dpi)
+        fig_w, fig_h = self.fig.get_size_inches()
+        with self.profiler.stage('savefig', path=path if isinstance(path, str) else None, dpi=dpi,
+                                 pixels=int(fig_w * dpi) * int(fig_h * dpi)):
+            self.fig.savefig(path, dpi=dpi, format=format, bbox_inches='tight', pad_inches=0.1)
+
+    def to_bytes(self, format='png', dpi=None):
+        """将整幅图编码为内存中的图像数据。"""
+        buf = io.BytesIO()
+        self.save(buf, dpi=dpi, format=format)
+        return buf.getvalue()
+
+    def close(self):
+        """释放画布、各子图的底图数据集与共享的几何。可重复调用。"""
+        if self._closed:
+            return
+        self._closed = True
+        for panel in self.panels:
+            panel.close()
+        if not self.headless:
+            import matplotlib.pyplot as plt
+
+            plt.close(self.fig)
+        self.fig.clear()
+        self.shared = SharedState()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -1,13 +1,16 @@
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-from matplotlib.collections import PatchCollection, LineCollection
-from matplotlib.path import Path
+import io
+import os
+import math
 import numpy as np
-from osgeo import osr, ogr
-from .core import RasterData, VectorData
-from .utils import GeoTransformer
+from .core import RasterData, VectorData, warp_to_grid
+from .geometry import draw_geometries
+from .utils import GeoTransformer, get_transformation
 from .components import NorthArrow, ScaleBar, Graticule
 from .axes import add_styled_colorbar
+from .classify import class_breaks
+from .cache import VectorCache
+from .frames import FrameRenderer, write_animation
+from .profiling import make_profiler
 
 
 class Map:
@@ -18,7 +21,8 @@ class Map:
     支持自动识别栅格 (GeoTIFF) 和矢量 (Shapefile) 数据作为底图。
     """
 
-    def __init__(self, filepath, figsize=(10, 10), nodata=None):
+    def __init__(self, filepath, figsize=(10, 10), nodata=None, lazy=False, dpi=300, bbox=None,
+                 bands=None, profile=False, headless=False, aggregate=None, ax=None, shared=None):
         """
         初始化地图对象。
 
@@ -28,41 +32,182 @@ class Map:
                 - 若为矢量 (.shp)，将作为底图并绘制轮廓。
             figsize (tuple): 画布大小 (宽, 高)，单位英寸。默认 (10, 10)。
             nodata (float): 强制指定的 NoData 值。若为 None 则尝试自动读取。
+            lazy (bool): 是否按显示分辨率读取栅格。开启后根据 figsize 与 dpi 计算
+                输出像素网格，仅读取金字塔或降采样后的数据，适合超大栅格。
+            dpi (int): 输出分辨率，lazy 模式下用于计算读取尺寸，也是 save() 的默认 dpi。
+            bbox (list): 地图范围 [xmin, xmax, ymin, ymax]，底图坐标系。
+                栅格底图只读取该范围内的像元，适合从大范围数据中制作局部图。
+            bands (tuple): 多波段栅格的 RGB 合成波段序号，如 (4, 3, 2)。
+                None 表示按第 1 波段以色带渲染。
+            profile (bool/str/callable/Profiler): 分阶段性能统计，结果见 Map.profiler。
+                - False: 关闭 (默认)，几乎没有额外开销。
+                - True: 记录各阶段耗时与要素/顶点/像元数。
+                - 'memory': 同时使用 tracemalloc 记录各阶段峰值内存。
+                - 可调用对象: 开启计时，每个阶段结束时以记录字典调用 (可转发到监控系统)。
+                - Profiler 对象: 直接使用，多个 Map 可共享同一统计器。
+            headless (bool): 无界面模式。直接创建 Figure 与 Agg 画布，不导入 pyplot、
+                不在 pyplot 的全局图形管理器中注册，适合长期运行的出图服务。
+                此模式下不能调用 show()。用完后应调用 close() 或使用 with 语句。
+            aggregate (str): 栅格底图按输出像素网格预先聚合 ('mean', 'max', 'min', 'mode')。
+                分块读取全分辨率数据并按块归约，NoData 不参与计算；传给 imshow 的数组与输出
+                像素大小相当，避免绘制时的混叠并减少图形占用的内存。分类数据请使用 'mode'。
+                None 表示不聚合 (默认)。
+            ax (Axes): 绘制到已有的坐标轴 (可选)，此时不创建新画布，close() 也不清空画布。
+                多子图布局请使用 MapGrid。
+            shared (SharedState): 与其他 Map 共享的坐标转换器、叠加矢量几何与经纬网几何 (可选)，
+                通常由 MapGrid 传入。
         """
-        self.fig, self.ax = plt.subplots(figsize=figsize)
+        self.headless = headless
+        self._closed = False
+        self._owns_figure = ax is None
+        self._shared = shared
+        if ax is not None:
+            self.fig, self.ax = ax.figure, ax
+        elif headless:
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+            self.fig = Figure(figsize=figsize)
+            FigureCanvasAgg(self.fig)
+            self.ax = self.fig.subplots()
+        else:
+            import matplotlib.pyplot as plt
+
+            self.fig, self.ax = plt.subplots(figsize=figsize)
         self.base_data = None
         self.data_type = None
         self._image_handle = None
         self.transformer = None
+        self.vector_stats = []
+        self._frame_renderer = None
+        self.filepath = filepath
+        self.nodata = nodata
+        self.lazy = lazy
+        self.aggregate = aggregate
+        self.dpi = dpi
+        self.bbox = bbox
+        self.bands = bands
+        self.percentiles = (2, 98)
+        self._loaded_dpi = dpi
+        self._array_data = False  # 当前底图图像是否为 set_data 传入的数组
+        self.profiler = make_profiler(profile)
 
         try:
-            self.base_data = RasterData(filepath, nodata=nodata)
+            self._load(filepath, nodata, lazy, aggregate, dpi, bbox, shared)
+        except BaseException:
+            # 数据无法打开或参数有误时释放已创建的画布，避免图形残留在 pyplot 中
+            self.close()
+            raise
+
+    def _load(self, filepath, nodata, lazy, aggregate, dpi, bbox, shared):
+        """打开底图数据并绘制，设置坐标轴范围。"""
+        try:
+            out_shape = self._display_shape(dpi) if lazy or aggregate else None
+            self.base_data = RasterData(filepath, nodata=nodata, out_shape=out_shape, window=bbox,
+                                        aggregate=aggregate)
             self.data_type = 'raster'
-        except Exception:
+        except FileNotFoundError:
+            # 仅在 GDAL 无法以栅格打开时尝试矢量，参数校验等错误直接抛出
             try:
                 self.base_data = VectorData(filepath)
                 self.data_type = 'vector'
-            except Exception:
+            except FileNotFoundError:
                 raise ValueError(f"无法识别文件格式或打开失败: {filepath}")
+            if bbox is not None:
+                self.base_data.set_spatial_filter(bbox)
 
-        self.transformer = GeoTransformer(self.base_data.crs)
+        if shared is not None:
+            self.transformer = shared.transformer(self.base_data.crs)
+        else:
+            self.transformer = GeoTransformer(self.base_data.crs)
         self._render_base_map()
 
-        xmin, xmax, ymin, ymax = self.base_data.extent
+        xmin, xmax, ymin, ymax = self.extent
         self.ax.set_xlim(xmin, xmax)
         self.ax.set_ylim(ymin, ymax)
         self.ax.set_aspect('equal')
         self.ax.axis('off')
 
+    @property
+    def extent(self):
+        """地图显示范围 [xmin, xmax, ymin, ymax]，栅格底图为对齐到像元后的读取范围。"""
+        if self.data_type == 'vector' and self.bbox is not None:
+            return list(self.bbox)
+        return self.base_data.extent
+
+    def _display_shape(self, dpi):
+        """主坐标轴在给定 dpi 下的像素尺寸 (行, 列)。"""
+        fig_w, fig_h = self.fig.get_size_inches()
+        pos = self.ax.get_position()
+        return (math.ceil(pos.height * fig_h * dpi), math.ceil(pos.width * fig_w * dpi))
+
+    def _pixel_size(self, dpi=None):
+        """主坐标轴在给定 dpi 下每个像素对应的地图单位长度。"""
+        dpi = dpi or self.dpi
+        self.ax.apply_aspect()
+        fig_w, fig_h = self.fig.get_size_inches()
+        pos = self.ax.get_position()
+        xmin, xmax, ymin, ymax = self.extent
+        return max(abs(xmax - xmin) / (pos.width * fig_w * dpi),
+                   abs(ymax - ymin) / (pos.height * fig_h * dpi))
+
+    def _reload_for_dpi(self, dpi):
+        """
+        lazy 或聚合模式下输出 dpi 高于已读取分辨率时，按新的分辨率重新读取底图。
+        底图图像为 set_data 传入的数组时不重新读取，以免覆盖调用方的数据。
+        """
+        if not ((self.lazy or self.aggregate) and self.data_type == 'raster') or \
+                dpi <= self._loaded_dpi or self._array_data:
+            return
+        new_data = RasterData(self.filepath, nodata=self.nodata, out_shape=self._display_shape(dpi),
+                              window=self.bbox, aggregate=self.aggregate)
+        self.base_data.close()
+        self.base_data = new_data
+        self._image_handle.set_data(self._load_base_image())
+        self._image_handle.set_extent(new_data.extent)
+        self._loaded_dpi = dpi
+
+    def _base_image(self):
+        """底图图像数组：单波段为掩膜数组，RGB 合成为 uint8 RGBA 数组。"""
+        if self.bands is not None:
+            return self.base_data.composite(self.bands, percentiles=self.percentiles)
+        return self.base_data.data
+
+    def _load_base_image(self):
+        with self.profiler.stage('raster_load', filepath=self.filepath) as rec:
+            image = self._base_image()
+            rec['pixels'] = image.shape[0] * image.shape[1]
+        return image
+
     def _render_base_map(self):
         if self.data_type == 'raster':
             self._image_handle = self.ax.imshow(
-                self.base_data.data, extent=self.base_data.extent,
+                self._load_base_image(), extent=self.base_data.extent,
                 cmap='terrain', interpolation='nearest'
             )
         elif self.data_type == 'vector':
             self._plot_vector_layer(self.base_data, facecolor='#eeeeee', edgecolor='black')
 
+    def set_bands(self, bands, percentiles=(2, 98)):
+        """
+        以 RGB 合成方式渲染多波段栅格底图。
+
+        各波段按需读取，拉伸范围由金字塔或降采样像元的百分位数估计，
+        合成结果为单个 uint8 RGBA 数组，NoData 像元透明。
+
+        Args:
+            bands (tuple): 依次作为 R、G、B 的波段序号。
+                常用: 真彩色 (3, 2, 1)，Sentinel-2 假彩色 (8, 4, 3)。
+            percentiles (tuple): 线性拉伸的百分位数 (低, 高)，默认 (2, 98)。
+        """
+        if self._image_handle is None:
+            raise ValueError("当前底图不是栅格数据，无法进行波段合成。")
+        self.bands = tuple(bands)
+        self.percentiles = percentiles
+        self._image_handle.set_data(self._load_base_image())
+        self._array_data = False
+        self._frame_renderer = None
+
     def set_title(self, title, fontsize=16, fontfamily=None):
         """
         设置地图标题。
@@ -72,6 +217,7 @@ class Map:
             fontsize (int): 字体大小。
             fontfamily (str): 字体名称 (如 'Arial', 'SimHei')。
         """
+        self._frame_renderer = None
         kwargs = {'fontsize': fontsize}
         if fontfamily:
             kwargs['fontfamily'] = fontfamily
@@ -87,17 +233,32 @@ class Map:
         """
         if self._image_handle:
             self._image_handle.set_cmap(cmap_name)
+            self._frame_renderer = None
 
-    def set_clim(self, vmin=None, vmax=None):
+    def set_clim(self, vmin=None, vmax=None, mode=None, p=(2, 98), k=2.0, approx=None):
         """
         设置色带的数据显示范围 (仅对栅格底图有效)。
 
         Args:
             vmin (float): 最小值。
             vmax (float): 最大值。
+            mode (str): 自动估计范围 (可选)，显式给出的 vmin/vmax 优先。
+                - 'percentile': 百分位数范围 p，单个离群像元不会影响拉伸。
+                - 'minmax': 最小值与最大值。
+                - 'std': 均值 ± k 倍标准差。
+                统计按金字塔采样或分块流式读取完成，超大栅格同样适用，结果按文件缓存。
+            p (tuple): 'percentile' 模式的百分位数 (低, 高)，默认 (2, 98)。
+            k (float): 'std' 模式的标准差倍数，默认 2。
+            approx (bool): True 采样估计；False 全分辨率流式统计；None 有金字塔时采样估计。
         """
-        if self._image_handle:
-            self._image_handle.set_clim(vmin=vmin, vmax=vmax)
+        if not self._image_handle:
+            return
+        if mode is not None:
+            lo, hi = self.base_data.clim(mode=mode, p=p, k=k, approx=approx)
+            vmin = lo if vmin is None else vmin
+            vmax = hi if vmax is None else vmax
+        self._image_handle.set_clim(vmin=vmin, vmax=vmax)
+        self._frame_renderer = None
 
     def add_north_arrow(self, location='top-right', style='nice', size=0.08,
                         font_size=None, font_family=None):
@@ -117,9 +278,11 @@ class Map:
             font_size (float): 'N' 标签字体大小。
             font_family (str): 字体名称。
         """
-        arrow = NorthArrow(self.ax)
-        arrow.draw(location=location, size=size, style_name=style,
-                   font_size=font_size, font_family=font_family)
+        self._frame_renderer = None
+        with self.profiler.stage('north_arrow'):
+            arrow = NorthArrow(self.ax)
+            arrow.draw(location=location, size=size, style_name=style,
+                       font_size=font_size, font_family=font_family)
 
     def add_scale_bar(self, location='bottom-left', unit='km', style='blocks',
                       font_size=None, font_family=None):
@@ -137,9 +300,11 @@ class Map:
                 - 'line-black': 黑色线段。
                 - 'line-white': 白色线段。
         """
-        bar = ScaleBar(self.ax)
-        bar.draw(self.base_data.crs, self.base_data.extent, location=location, unit=unit,
-                 style_name=style, font_size=font_size, font_family=font_family)
+        self._frame_renderer = None
+        with self.profiler.stage('scale_bar'):
+            bar = ScaleBar(self.ax)
+            bar.draw(self.base_data.crs, self.extent, location=location, unit=unit,
+                     style_name=style, font_size=font_size, font_family=font_family)
 
     def add_grid(self, style='default', interval=None, font_size=None, font_family=None,
                  label_sides=['bottom', 'left'], label_rotation=0,
@@ -157,18 +322,21 @@ class Map:
             label_rotation (float/dict): 标注旋转角度。
             padding (float): 标注距离图廓的间距 (相对画布比例，默认 0.01)。
         """
-        grid = Graticule(self.ax)
-        grid.draw(self.transformer, self.base_data.extent, style_name=style,
-                  interval=interval, font_size=font_size, font_family=font_family,
-                  label_sides=label_sides, label_rotation=label_rotation,
-                  padding=padding)
+        self._frame_renderer = None
+        with self.profiler.stage('graticule'):
+            grid = Graticule(self.ax)
+            grid.draw(self.transformer, self.extent, style_name=style,
+                      interval=interval, font_size=font_size, font_family=font_family,
+                      label_sides=label_sides, label_rotation=label_rotation,
+                      padding=padding,
+                      cache=self._shared.graticules if self._shared is not None else None)
 
     def add_colorbar(self, location='right', width="5%", pad="2%", extend='neither',
                      label="", label_size=12, tick_size=10, color='black',
-                     font_family='Arial'):
+                     font_family='Arial', mappable=None):
         """
         添加色带 (Colorbar)。
-        需确保底图为栅格数据。
+        默认对应栅格底图；也可通过 mappable 为叠加图层 (add_raster、add_point_density 的返回值) 添加。
 
         Args:
             location (str): 位置 ('right', 'left', 'bottom', 'top')。
@@ -177,120 +345,491 @@ class Map:
             extend (str): 尖角样式 ('neither', 'both', 'min', 'max')。
             label (str): 色带标签文本 (如单位)。
             color (str): 文本和边框颜色。
+            mappable: 色带对应的图层 (可选)，默认为栅格底图。
         """
-        if self._image_handle is None:
-            print("警告: 当前未绘制栅格数据，无法添加色带。")
-            return
+        if mappable is None:
+            if self._image_handle is None:
+                print("警告: 当前未绘制栅格数据，无法添加色带。")
+                return
+            if self.bands is not None:
+                print("警告: RGB 合成影像没有色带，无法添加色带。")
+                return
+            mappable = self._image_handle
+
+        self._frame_renderer = None
+        with self.profiler.stage('colorbar'):
+            add_styled_colorbar(
+                fig=self.fig,
+                mappable=mappable,
+                ax=self.ax,
+                location=location,
+                width=width,
+                pad=pad,
+                extend=extend,
+                label=label,
+                label_size=label_size,
+                tick_size=tick_size,
+                color=color,
+                font_family=font_family
+            )
 
-        add_styled_colorbar(
-            fig=self.fig,
-            mappable=self._image_handle,
-            ax=self.ax,
-            location=location,
-            width=width,
-            pad=pad,
-            extend=extend,
-            label=label,
-            label_size=label_size,
-            tick_size=tick_size,
-            color=color,
-            font_family=font_family
-        )
-
-    def add_vector(self, filepath, **kwargs):
+    def add_raster(self, filepath, cmap='viridis', alpha=1.0, vmin=None, vmax=None,
+                   nodata=None, band=1, resample='nearest', zorder=None):
+        """
+        叠加额外的栅格图层。
+
+        叠加栅格按显示分辨率重投影到底图坐标系与范围 (内存中多线程完成)，
+        坐标系与底图不同的栅格同样可用。重投影结果按 (源文件, 目标网格) 缓存，
+        重复绘制时跳过重投影。
+
+        Args:
+            filepath (str): 栅格文件路径。
+            cmap (str): Matplotlib 色带名称。
+            alpha (float): 透明度。
+            vmin (float): 色带最小值。
+            vmax (float): 色带最大值。
+            nodata (float): 强制指定的 NoData 值。
+            band (int): 波段序号。
+            resample (str): 重采样方式 ('nearest', 'bilinear', 'cubic', 'average', 'mode' 等)。
+            zorder (float): 图层叠放次序。
+
+        Returns:
+            AxesImage: 叠加图层的图像对象。
+        """
+        _, shape = self._overlay_grid()
+        with self.profiler.stage('raster_warp', filepath=filepath, pixels=shape[0] * shape[1]):
+            array = warp_to_grid(filepath, self.base_data.crs, self.extent, shape,
+                                 band=band, nodata=nodata, resample=resample)
+        image = self.ax.imshow(array, extent=self.extent, cmap=cmap, alpha=alpha,
+                               vmin=vmin, vmax=vmax, interpolation='nearest', zorder=zorder)
+        self._frame_renderer = None
+        return image
+
+    def _overlay_grid(self):
+        """叠加图层使用的正方形像元网格，返回 (像元边长, (行, 列))，与输出像素大小相当。"""
+        xmin, xmax, ymin, ymax = self.extent
+        rows, cols = self._display_shape(self.dpi)
+        px = max(abs(xmax - xmin) / cols, abs(ymax - ymin) / rows)
+        shape = (max(1, math.ceil(abs(ymax - ymin) / px)), max(1, math.ceil(abs(xmax - xmin) / px)))
+        return px, shape
+
+    def add_point_density(self, filepath, column=None, stat='count', cmap='viridis', alpha=1.0,
+                          vmin=None, vmax=None, log=False, clip=True, zorder=None):
+        """
+        将大规模点图层按输出像素网格聚合后以栅格形式叠加。
+
+        点坐标批量读取并转换后，通过向量化直方图 (np.bincount) 统计落在每个像素中的点，
+        结果作为单个图像图层绘制，没有点的像素透明。绘制耗时与输出文件大小只与像素数有关，
+        与点数无关 (PDF 等矢量格式中也不再逐点写出标记)。
+
+        Args:
+            filepath (str): 点矢量文件路径 (多点要素的每个点分别计入)。
+            column (str): 数值属性字段，stat 为 'sum' 或 'mean' 时必需。
+            stat (str): 统计量。
+                - 'count': 点数 (默认)。
+                - 'sum': 属性值之和。
+                - 'mean': 属性值均值。
+            cmap (str): Matplotlib 色带名称。
+            alpha (float): 透明度。
+            vmin (float): 色带最小值。
+            vmax (float): 色带最大值。
+            log (bool): 是否使用对数色阶 (点数跨越多个数量级时适用)。
+            clip (bool): 是否只读取地图范围内的要素 (默认 True)。
+            zorder (float): 图层叠放次序。
+
+        Returns:
+            AxesImage: 密度图层，可传给 add_colorbar(mappable=...) 添加独立色带。
+        """
+        if stat not in ('count', 'sum', 'mean'):
+            raise ValueError(f"不支持的统计量: {stat}，可选 ('count', 'sum', 'mean')")
+        if stat != 'count' and column is None:
+            raise ValueError(f"统计量 '{stat}' 需要指定属性字段 column。")
+
+        target_crs = self.base_data.crs
+        vector = VectorData(filepath)
+        if clip:
+            vector.set_spatial_filter(self.extent, target_crs)
+        coord_trans = None
+        if not vector.crs.IsSame(target_crs):
+            coord_trans = get_transformation(vector.crs, target_crs)
+        columns = [column] if stat != 'count' else None
+        geoms = self._read_vector(vector, coord_trans, columns=columns)
+        vector.close()
+
+        xmin, xmax, ymin, ymax = self.extent
+        px, (rows, cols) = self._overlay_grid()
+        points = geoms.point_coords
+        with self.profiler.stage('point_density', filepath=filepath, points=len(points),
+                                 pixels=rows * cols):
+            c = np.floor((points[:, 0] - xmin) / px)
+            r = np.floor((ymax - points[:, 1]) / px)
+            ok = (c >= 0) & (c < cols) & (r >= 0) & (r < rows)
+            weights = None
+            if columns:
+                values = geoms.attributes[column]
+                if values.dtype == object:
+                    raise ValueError(f"字段 {column} 不是数值类型，无法统计 '{stat}'。")
+                values = values[geoms.point_features]
+                ok &= np.isfinite(values)
+                weights = values[ok]
+            flat = r[ok].astype(np.int64) * cols + c[ok].astype(np.int64)
+            count = np.bincount(flat, minlength=rows * cols).reshape(rows, cols)
+            if stat == 'count':
+                grid = count.astype(np.float32)
+            else:
+                grid = np.bincount(flat, weights=weights, minlength=rows * cols).reshape(rows, cols)
+                if stat == 'mean':
+                    grid /= np.maximum(count, 1)
+            grid = np.ma.masked_where(count == 0, grid)
+
+        norm = None
+        if log:
+            from matplotlib.colors import LogNorm
+            norm = LogNorm(vmin=vmin, vmax=vmax)
+            vmin = vmax = None
+        image = self.ax.imshow(grid, extent=[xmin, xmin + cols * px, ymax - rows * px, ymax],
+                               cmap=cmap, alpha=alpha, vmin=vmin, vmax=vmax, norm=norm,
+                               interpolation='nearest', zorder=zorder)
+        self._frame_renderer = None
+        return image
+
+    def add_vector(self, filepath, cache_dir=None, clip=True, simplify=None, column=None,
+                   cmap='viridis', classification='quantiles', k=5, legend=False,
+                   missing='lightgrey', **kwargs):
         """
         叠加额外的矢量图层。
+        指定 column 时按属性值分级设色 (专题图)：属性列随几何批量读取，分级与颜色映射均为
+        向量化计算，整个图层仍只生成一个集合对象。
 
         Args:
             filepath (str): 矢量文件路径 (.shp 等)。
+            cache_dir (str/VectorCache): 磁盘缓存目录 (可选)。开启后解析并重投影后的
+                几何会以内存映射数组形式缓存，重复绘制同一图层时几乎没有解析开销。
+                缓存的是未裁剪的整个图层，不同范围的地图共用同一缓存项，读取后按地图范围筛选要素。
+            clip (bool): 是否只读取与地图范围相交的要素 (默认 True)。过滤由 OGR 在批量读取时完成，
+                数据源自带空间索引 (.qix / GPKG R-tree) 时只访问相交的要素。
+            simplify (str/float): 显示分辨率简化。
+                - None: 不简化 (默认)。
+                - 'auto': 容差取输出 dpi 下半个像素对应的地图单位长度。
+                - float: 以地图单位表示的容差。
+                简化前后的顶点数记录在 Map.vector_stats 中。
+            column (str): 用于着色的数值属性字段 (可选)。面按填充色、线按线色、点按点色着色。
+            cmap (str): Matplotlib 色带名称，仅 column 有效。
+            classification (str): 分级方法，仅 column 有效。
+                - 'quantiles': 分位数 (默认)。
+                - 'equal_interval': 等间距。
+                - 'natural_breaks': 自然断点 (Jenks)。
+                - None: 不分级，按数值连续着色。
+            k (int): 级数。
+            legend (bool/str): 是否添加分级图例，也可直接给出图例位置 (如 'lower left')。
+            missing (str): 属性值为空的要素的颜色。
             **kwargs: Matplotlib 绘图参数。
                 - facecolor (fc): 填充色 (如 'none')。
                 - edgecolor (ec): 边框色 (如 'red')。
                 - linewidth (lw): 线宽。
                 - alpha: 透明度。
+
+        Returns:
+            Collection: 图层的首个集合对象；按属性着色时可传给 add_colorbar(mappable=...)。
         """
-        vector = VectorData(filepath)
-        target_crs = self.base_data.crs
-        source_crs = vector.crs
+        cache = cache_dir
+        if cache is not None and not isinstance(cache, VectorCache):
+            cache = VectorCache(cache)
 
-        coord_trans = None
-        if not source_crs.IsSame(target_crs):
-            coord_trans = osr.CoordinateTransformation(source_crs, target_crs)
+        tolerance = simplify
+        if simplify == 'auto':
+            tolerance = self._pixel_size() * 0.5
+            if cache is not None:
+                # 向下取整到 2 的整数次幂，比例尺相近的地图可共用同一缓存项
+                tolerance = 2.0 ** math.floor(math.log2(tolerance))
 
-        self._plot_vector_layer(vector, transform=coord_trans, **kwargs)
+        target_crs = self.base_data.crs
+        clip_extent = self.extent if clip else None
+        columns = [column] if column is not None else None
+        # 缓存项为未裁剪的整个图层，与地图范围无关，读取后再按范围筛选
+        key = cache.key(filepath, target_crs, simplify=tolerance,
+                        extra={'columns': columns} if columns else None) if cache is not None else None
+        geoms = None
+        layer = None
+        shared_key = None
+        if self._shared is not None:
+            shared_key = (os.path.abspath(filepath), target_crs.ExportToWkt(),
+                          tuple(clip_extent) if clip_extent is not None else None,
+                          tolerance, column)
+            geoms = self._shared.geometries.get(shared_key)
+        if geoms is None and cache is not None:
+            with self.profiler.stage('vector_cache', filepath=filepath) as rec:
+                layer = cache.load(key)
+                rec['hit'] = layer is not None
+        vertices = None
+
+        if geoms is None and layer is None:
+            vector = VectorData(filepath)
+            source_crs = vector.crs
+            if clip_extent is not None and cache is None:
+                vector.set_spatial_filter(clip_extent, target_crs)
+
+            coord_trans = None
+            if not source_crs.IsSame(target_crs):
+                coord_trans = get_transformation(source_crs, target_crs)
+
+            geoms = self._read_vector(vector, coord_trans, columns=columns)
+            vector.close()
+            if columns and geoms.attributes[column].dtype == object:
+                raise ValueError(f"字段 {column} 不是数值类型，无法分级设色。")
+            vertices = geoms.vertex_count
+            if tolerance:
+                with self.profiler.stage('vector_simplify', filepath=filepath,
+                                         vertices=vertices) as rec:
+                    geoms = geoms.simplify(tolerance)
+                    rec['vertices_out'] = geoms.vertex_count
+            if cache is not None:
+                cache.store(key, geoms)
+                layer = geoms
+        if layer is not None:
+            geoms = layer.select(clip_extent) if clip_extent is not None else layer
+        if shared_key is not None:
+            self._shared.geometries[shared_key] = geoms
+
+        self._frame_renderer = None
+        self.vector_stats.append({
+            'filepath': filepath,
+            'tolerance': tolerance,
+            'vertices': vertices,  # 命中缓存时为 None
+            'vertices_drawn': geoms.vertex_count,
+        })
+        if column is None:
+            artists = self._draw_geometries(geoms, **kwargs)
+            return artists[0] if artists else None
+
+        import matplotlib
+        from matplotlib.colors import BoundaryNorm, Normalize
+
+        values = np.asarray(geoms.attributes[column], dtype=np.float64)
+        colormap = matplotlib.colormaps[cmap] if isinstance(cmap, str) else cmap.copy()
+        colormap.set_bad(missing)
+        valid = values[np.isfinite(values)]
+        if classification is None:
+            norm = Normalize(*((valid.min(), valid.max()) if valid.size else (0, 1)))
+        elif valid.size:
+            norm = BoundaryNorm(class_breaks(valid, k, classification), colormap.N, clip=True)
+        else:
+            norm = BoundaryNorm([0, 1], colormap.N, clip=True)
+        artists = self._draw_geometries(geoms, values=values, cmap=colormap, norm=norm, **kwargs)
+        if legend and isinstance(norm, BoundaryNorm) and valid.size:
+            self._add_class_legend(norm, colormap, column,
+                                   loc=legend if isinstance(legend, str) else 'best')
+        return artists[0] if artists else None
+
+    def _add_class_legend(self, norm, cmap, title, loc='best'):
+        """为分级设色图层添加图例，每级一个色块，标注数值范围。"""
+        from matplotlib.patches import Patch
+
+        edges = norm.boundaries
+        centers = (edges[:-1] + edges[1:]) / 2
+        colors = cmap(norm(centers))
+        handles = [Patch(facecolor=color, edgecolor='black', linewidth=0.5,
+                         label=f"{lo:.4g} – {hi:.4g}")
+                   for color, lo, hi in zip(colors, edges[:-1], edges[1:])]
+        self.ax.legend(handles=handles, title=title, loc=loc, fontsize='small',
+                       title_fontsize='small', framealpha=0.9)
 
     def _plot_vector_layer(self, vector_obj, transform=None, **kwargs):
-        layer = vector_obj.layer
-        patches = []
-        lines = []
-        points = []
-
-        for feature in layer:
-            geom = feature.GetGeometryRef()
-            if not geom: continue
-            if transform:
-                geom = geom.Clone()
-                geom.Transform(transform)
-            self._parse_geometry(geom, patches, lines, points)
-
-        if patches:
-            poly_kwargs = {k: v for k, v in kwargs.items() if k not in []}
-            collection = PatchCollection(patches, match_original=False, **kwargs)
-            self.ax.add_collection(collection)
-
-        if lines:
-            lc = LineCollection(lines, **kwargs)
-            self.ax.add_collection(lc)
-
-        if points:
-            xs, ys = zip(*points)
-            self.ax.scatter(xs, ys, **kwargs)
-
-    def _parse_geometry(self, geom, patches_list, lines_list, points_list):
-        gt = geom.GetGeometryType()
-
-        if gt == ogr.wkbPoint or gt == ogr.wkbPoint25D:
-            points_list.append((geom.GetX(), geom.GetY()))
-
-        elif gt == ogr.wkbLineString or gt == ogr.wkbLineString25D:
-            pts = geom.GetPoints()
-            lines_list.append([p[:2] for p in pts])
-
-        elif gt == ogr.wkbPolygon or gt == ogr.wkbPolygon25D:
-            ring_codes = []
-            ring_verts = []
-            for i in range(geom.GetGeometryCount()):
-                ring = geom.GetGeometryRef(i)
-                pts = ring.GetPoints()
-                if not pts: continue
-                vert = [p[:2] for p in pts]
-                ring_verts.extend(vert)
-                codes = [Path.MOVETO] + [Path.LINETO] * (len(vert) - 2) + [Path.CLOSEPOLY]
-                ring_codes.extend(codes)
-            if ring_verts:
-                path = Path(ring_verts, ring_codes)
-                patches_list.append(mpatches.PathPatch(path))
-
-        elif gt in [ogr.wkbMultiPolygon, ogr.wkbMultiLineString, ogr.wkbMultiPoint, ogr.wkbGeometryCollection,
-                    ogr.wkbMultiPolygon25D, ogr.wkbMultiLineString25D, ogr.wkbMultiPoint25D,
-                    ogr.wkbGeometryCollection25D]:
-            for i in range(geom.GetGeometryCount()):
-                sub_geom = geom.GetGeometryRef(i)
-                self._parse_geometry(sub_geom, patches_list, lines_list, points_list)
+        self._draw_geometries(self._read_vector(vector_obj, transform), **kwargs)
+
+    def _read_vector(self, vector_obj, transform=None, columns=None):
+        """读取 (并转换) 矢量几何，分别记录读取与坐标转换阶段。"""
+        profiler = self.profiler
+        with profiler.stage('vector_read', filepath=vector_obj.filepath) as rec:
+            geoms = vector_obj.read_geometries(columns=columns)
+            if profiler.enabled:
+                rec.update(features=geoms.feature_count, vertices=geoms.vertex_count)
+        if transform:
+            with profiler.stage('vector_transform', filepath=vector_obj.filepath,
+                                vertices=geoms.vertex_count):
+                geoms = geoms.transform(transform)
+        return geoms
+
+    def _draw_geometries(self, geoms, **kwargs):
+        with self.profiler.stage('vector_draw', vertices=geoms.vertex_count):
+            return draw_geometries(self.ax, geoms, **kwargs)
+
+    def set_data(self, source, vmin=None, vmax=None):
+        """
+        原地替换栅格底图数据，保留已添加的全部组件。
+        适合同一网格的时间序列：配合 save_frame() 每帧只需一次读取和一次图像编码。
+
+        Args:
+            source (str/ndarray): 新的栅格文件路径，或与当前底图形状相同的数组。
+                文件需与当前底图网格一致 (读取范围、分辨率相同)。
+                传入数组后，lazy 或聚合模式下以更高 dpi 保存时不再按新分辨率重新读取底图文件。
+            vmin (float): 新的色带最小值 (可选)。
+            vmax (float): 新的色带最大值 (可选)。
+        """
+        if self._image_handle is None:
+            raise ValueError("当前底图不是栅格数据，无法替换数据。")
+
+        if isinstance(source, str):
+            new_data = RasterData(source, nodata=self.nodata, out_shape=self.base_data.out_shape,
+                                  window=self.bbox, aggregate=self.aggregate)
+            if new_data.shape != self.base_data.shape or \
+                    not np.allclose(new_data.extent, self.base_data.extent):
+                new_data.close()
+                raise ValueError(f"栅格网格与当前底图不一致，无法替换: {source}")
+            self.base_data.close()
+            self.base_data = new_data
+            self.filepath = source
+            array = self._load_base_image()
+        else:
+            array = np.ma.asarray(source)
+            if array.shape != self._image_handle.get_array().shape:
+                raise ValueError(f"数组形状 {array.shape} 与当前底图不一致。")
+
+        self._image_handle.set_data(array)
+        self._array_data = not isinstance(source, str)
+        if vmin is not None or vmax is not None:
+            self.set_clim(vmin=vmin, vmax=vmax)
+
+    def save_frame(self, path, dpi=None):
+        """
+        保存当前帧。静态图层 (矢量、经纬网、指北针、比例尺、色带等) 只在首次调用时渲染，
+        之后每次仅重绘栅格图像并合成，输出与 save() 一致。
+
+        Args:
+            path (str): 输出路径 (如 'frame_001.png')。
+            dpi (int): 分辨率，默认使用初始化时的 dpi。
+        """
+        dpi = dpi or self.dpi
+        if self._image_handle is None:
+            self.save(path, dpi=dpi)
+            return
+        if self._frame_renderer is None or self._frame_renderer.dpi != dpi:
+            self._reload_for_dpi(dpi)
+            self._frame_renderer = FrameRenderer(self.fig, self._image_handle, dpi)
+        with self.profiler.stage('save_frame', path=path):
+            self._frame_renderer.save(path)
+
+    def animate(self, path, sources=None, bands=None, fps=5, dpi=None):
+        """
+        将多波段栅格或有序的栅格列表导出为动画。
+
+        每帧只读取一个波段并替换底图数据，静态图层只渲染一次，峰值内存约为一帧。
+        色带范围沿用当前底图 (建议先调用 set_clim 固定范围)。导出结束后恢复原底图数据。
+
+        Args:
+            path (str): 输出路径。
+                - '.gif': GIF 动画。
+                - '.mp4' 等: 通过 ffmpeg 编码的视频。
+                - 含格式占位符 (如 'out/frame_{:03d}.png'): 逐帧图片。
+            sources (list): 有序的栅格文件路径列表 (各取第 1 波段)，需与底图网格一致。
+            bands (list): 底图文件的波段序号列表。sources 与 bands 均为 None 时使用底图的全部波段。
+            fps (int): 帧率。
+            dpi (int): 分辨率，默认使用初始化时的 dpi。
+
+        Returns:
+            int: 写出的帧数。
+        """
+        if self._image_handle is None or self.bands is not None:
+            raise ValueError("当前底图不是单波段栅格数据，无法导出动画。")
+
+        if sources is not None:
+            layers = [(src, 1) for src in sources]
+        else:
+            if bands is None:
+                bands = range(1, self.base_data.band_count + 1)
+            layers = [(self.filepath, b) for b in bands]
+
+        dpi = dpi or self.dpi
+        self._reload_for_dpi(dpi)
+        original = self._image_handle.get_array()
+        renderer = FrameRenderer(self.fig, self._image_handle, dpi)
+        shape = original.shape
+
+        def frames():
+            for src, band in layers:
+                with self.profiler.stage('raster_load', filepath=src, band=band) as rec:
+                    layer = RasterData(src, nodata=self.nodata, out_shape=self.base_data.out_shape,
+                                       window=self.bbox, band=band, aggregate=self.aggregate)
+                    array = layer.data
+                    layer.close()
+                    rec['pixels'] = array.shape[0] * array.shape[1]
+                if array.shape != shape:
+                    raise ValueError(f"栅格网格与当前底图不一致: {src} (波段 {band})")
+                self._image_handle.set_data(array)
+                with self.profiler.stage('frame_render'):
+                    frame = renderer.render()
+                yield frame
+
+        try:
+            return write_animation(frames(), path, fps=fps)
+        finally:
+            self._image_handle.set_data(original)
 
     def show(self):
         """显示交互式绘图窗口。"""
+        if self.headless:
+            raise ValueError("无界面模式 (headless=True) 下无法显示窗口，请使用 save()。")
+        import matplotlib.pyplot as plt
+
         plt.show()
 
-    def save(self, path, dpi=300):
+    def save(self, path, dpi=None, format=None):
         """
         保存地图为图片。
 
         Args:
-            path (str): 输出路径 (如 'map.png', 'map.pdf')。
-            dpi (int): 分辨率，默认 300。
+            path (str/file): 输出路径 (如 'map.png', 'map.pdf') 或可写的文件对象。
+            dpi (int): 分辨率，默认使用初始化时的 dpi (300)。
+            format (str): 输出格式 (如 'png', 'pdf')。None 表示由扩展名决定。
+        """
+        dpi = dpi or self.dpi
+        self._reload_for_dpi(dpi)
+        fig_w, fig_h = self.fig.get_size_inches()
+        with self.profiler.stage('savefig', path=path if isinstance(path, str) else None, dpi=dpi,
+                                 pixels=int(fig_w * dpi) * int(fig_h * dpi)):
+            self.fig.savefig(path, dpi=dpi, format=format, bbox_inches='tight', pad_inches=0.1)
+
+    def to_bytes(self, format='png', dpi=None):
+        """
+        将地图编码为内存中的图像数据，不经过磁盘。
+
+        Args:
+            format (str): 输出格式，默认 'png'。
+            dpi (int): 分辨率，默认使用初始化时的 dpi。
+        Returns:
+            bytes: 编码后的图像。
         """
-        self.fig.savefig(path, dpi=dpi, bbox_inches='tight', pad_inches=0.1)
+        buf = io.BytesIO()
+        self.save(buf, dpi=dpi, format=format)
+        return buf.getvalue()
+
+    def close(self):
+        """
+        释放画布与底图数据集。可重复调用。
+
+        非无界面模式下同时从 pyplot 的图形管理器中移除该图形。
+        画布内容会被清空以解除图层之间的循环引用，内存无需等待垃圾回收即可释放。
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._owns_figure:
+            if not self.headless:
+                import matplotlib.pyplot as plt
+
+                plt.close(self.fig)
+            self.fig.clear()
+        self._frame_renderer = None
+        self._image_handle = None
+        if self.base_data:
+            self.base_data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
 
     def __del__(self):
         if hasattr(self, 'base_data') and self.base_data:
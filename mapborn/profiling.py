@@ -0,0 +1,170 @@
+"""
+profiling.py
+分阶段计时与内存统计：记录各绘图阶段的耗时、峰值内存及要素/顶点/像元数。
+"""
+import time
+import threading
+import tracemalloc
+
+# Python 3.8 没有 reset_peak，此时 peak_memory 为自开始跟踪以来的峰值
+_RESET_PEAK = getattr(tracemalloc, 'reset_peak', None)
+
+
+class _NullStage:
+    """关闭统计时使用的空阶段，进入与退出均不做任何事。"""
+
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, profiler, name, counts):
+        self.profiler = profiler
+        self.record = {'stage': name}
+        self.record.update(counts)
+        self._peak = 0
+
+    def __enter__(self):
+        p = self.profiler
+        if p.memory:
+            stack = p._stack()
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]._peak = max(stack[-1]._peak, peak)
+            if _RESET_PEAK is not None:
+                _RESET_PEAK()
+            self._base = current
+            stack.append(self)
+        self._start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._start
+        p = self.profiler
+        record = self.record
+        record['wall'] = wall
+        if p.memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            stack = p._stack()
+            stack.pop()
+            record['peak_memory'] = max(self._peak, peak) - self._base
+            if stack:
+                stack[-1]._peak = max(stack[-1]._peak, peak)
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        p._finish(record)
+        return False
+
+
+class Profiler:
+    """
+    分阶段性能统计器。
+
+    每个阶段记录为一个字典::
+
+        {'stage': 'vector_read', 'wall': 0.84, 'peak_memory': 52428800,
+         'filepath': 'roads.shp', 'features': 120000, 'vertices': 3500000}
+
+    - wall: 耗时 (秒)。
+    - peak_memory: 阶段内新增的峰值内存 (字节)，仅 memory=True 时记录 (基于 tracemalloc)。
+    - 其余为阶段相关的计数，如 features (要素数)、vertices (顶点数)、pixels (像元数)。
+
+    关闭时 stage() 返回空上下文，开销可忽略。
+    """
+
+    def __init__(self, enabled=True, memory=False, callback=None):
+        """
+        Args:
+            enabled (bool): 是否记录。
+            memory (bool): 是否使用 tracemalloc 统计峰值内存 (会明显拖慢 Python 层分配)。
+            callback (callable): 每个阶段结束时以记录字典调用，可用于转发到监控系统。
+        """
+        self.enabled = enabled
+        self.memory = enabled and memory
+        self.callback = callback
+        self.records = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def stage(self, name, **counts):
+        """
+        返回记录一个阶段的上下文管理器，as 得到的记录字典可在阶段内补充计数::
+
+            with profiler.stage('vector_read', filepath=path) as rec:
+                geoms = vector.read_geometries()
+                rec['vertices'] = geoms.vertex_count
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, counts)
+
+    def _finish(self, record):
+        with self._lock:
+            self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def report(self):
+        """返回全部阶段记录 (按完成顺序) 的副本。"""
+        with self._lock:
+            return [dict(r) for r in self.records]
+
+    def summary(self):
+        """
+        按阶段名汇总: {stage: {'calls', 'wall', 'peak_memory', 计数之和...}}。
+        wall 与计数为累加值，peak_memory 为最大值。
+        """
+        result = {}
+        for record in self.report():
+            entry = result.setdefault(record['stage'], {'calls': 0, 'wall': 0.0})
+            entry['calls'] += 1
+            for key, value in record.items():
+                if key == 'peak_memory':
+                    entry[key] = max(entry.get(key, 0), value)
+                elif key == 'wall' or (isinstance(value, (int, float)) and not isinstance(value, bool)):
+                    entry[key] = entry.get(key, 0) + value
+        return result
+
+    def reset(self):
+        """清空已有记录。"""
+        with self._lock:
+            self.records = []
+
+    def __repr__(self):
+        lines = [f"{'stage':<18}{'calls':>6}{'wall(s)':>10}{'peak(MB)':>10}"]
+        for name, entry in self.summary().items():
+            peak = entry.get('peak_memory')
+            peak = f"{peak / 1048576:.1f}" if peak is not None else '-'
+            lines.append(f"{name:<18}{entry['calls']:>6}{entry['wall']:>10.3f}{peak:>10}")
+        return '\n'.join(lines)
+
+
+def make_profiler(profile):
+    """
+    将 Map 的 profile 参数转换为 Profiler。
+
+    Args:
+        profile: False/None 关闭；True 仅计时；'memory' 计时并统计峰值内存；
+            可调用对象作为回调并开启计时；Profiler 对象直接使用。
+    """
+    if isinstance(profile, Profiler):
+        return profile
+    if callable(profile):
+        return Profiler(callback=profile)
+    if profile == 'memory':
+        return Profiler(memory=True)
+    return Profiler(enabled=bool(profile))
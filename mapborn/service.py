@@ -0,0 +1,138 @@
+"""
+service.py
+面向 asyncio 的出图接口：在有界执行器中出图，合并相同的并发请求，结果以内存中的图像数据返回。
+"""
+import os
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .batch import _init_worker
+
+
+class AsyncRenderer:
+    """
+    异步出图器。
+
+    出图在执行器 (默认进程池) 中完成，不阻塞事件循环::
+
+        renderer = AsyncRenderer(max_workers=4)
+
+        async def handler(request):
+            png = await renderer.render('dem.tif', template, dpi=150)
+            return web.Response(body=png, content_type='image/png')
+
+    - 背压: 同时提交到执行器的出图任务不超过 max_pending 个，其余请求在 await 处排队等待，
+      不会无限堆积在执行器队列中。
+    - 请求合并: 输入文件 (路径、修改时间、大小)、模板、格式、dpi 与构造参数均相同的并发请求
+      共享同一次出图。某个等待者被取消不会影响其他等待者。
+    - 结果缓存 (可选): 传入 RenderCache 后，命中的请求直接返回缓存字节，不提交到执行器。
+    """
+
+    def __init__(self, max_workers=None, max_pending=None, processes=True, gdal_cache_mb=256,
+                 mp_context=None, cache=None):
+        """
+        Args:
+            max_workers (int): 执行器工作者数，默认为 CPU 核数。
+            max_pending (int): 同时执行或排队于执行器中的出图任务上限，默认为 max_workers。
+            processes (bool): True 使用进程池 (Agg 后端，可绕过 GIL)；False 使用线程池。
+            gdal_cache_mb (int): 每个工作进程的 GDAL 块缓存上限 (MB)，仅进程池有效。
+            mp_context (str): multiprocessing 启动方式 ('fork', 'spawn', 'forkserver')。
+            cache (RenderCache): 出图结果缓存 (可选)。
+        """
+        self.cache = cache
+        self.max_workers = max_workers or os.cpu_count()
+        self.max_pending = max_pending or self.max_workers
+        if processes:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context(mp_context),
+                initializer=_init_worker, initargs=(gdal_cache_mb,))
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._semaphore = None
+        self._inflight = {}
+        self.stats = {'requests': 0, 'renders': 0, 'coalesced': 0, 'cached': 0, 'errors': 0}
+
+    async def render(self, filepath, template, format='png', dpi=None, **map_overrides):
+        """
+        按模板异步出图。
+
+        Args:
+            filepath (str): 输入数据路径。
+            template (MapTemplate): 地图模板。
+            format (str): 输出格式，默认 'png'。
+            dpi (int): 分辨率，None 表示使用模板中的 dpi。
+            **map_overrides: 覆盖模板构造参数 (如 bbox)。
+        Returns:
+            bytes: 编码后的图像。
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+        self.stats['requests'] += 1
+        # 计算键 (读取文件状态) 与查询缓存 (可能读磁盘) 都在线程中进行，不阻塞事件循环
+        loop = asyncio.get_running_loop()
+        key = await loop.run_in_executor(
+            None, functools.partial(template.key, filepath, format=format, dpi=dpi,
+                                    overrides=map_overrides))
+        if self.cache is not None:
+            data = await loop.run_in_executor(None, self.cache.get, key)
+            if data is not None:
+                self.stats['cached'] += 1
+                return data
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(key, filepath, template, format, dpi,
+                                                   map_overrides))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            task.add_done_callback(_consume_exception)
+        else:
+            self.stats['coalesced'] += 1
+        return await asyncio.shield(task)
+
+    async def _run(self, key, filepath, template, format, dpi, map_overrides):
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            self.stats['renders'] += 1
+            try:
+                data = await loop.run_in_executor(self._executor, _render_bytes, template,
+                                                  filepath, format, dpi, map_overrides)
+            except Exception:
+                self.stats['errors'] += 1
+                raise
+        if self.cache is not None:
+            await loop.run_in_executor(None, self.cache.put, key, data)
+        return data
+
+    @property
+    def in_flight(self):
+        """正在进行 (含排队) 的不同出图任务数。"""
+        return len(self._inflight)
+
+    async def aclose(self):
+        """等待进行中的出图完成后关闭执行器。"""
+        if self._inflight:
+            await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+        self._executor.shutdown(wait=True)
+
+    def close(self):
+        """关闭执行器 (阻塞直至已提交的任务完成)。"""
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+        return False
+
+
+def _consume_exception(task):
+    # 所有等待者都已取消时，异常仍被读取，避免 "Future exception was never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+
+def _render_bytes(template, filepath, format, dpi, map_overrides):
+    return template.render_bytes(filepath, format=format, dpi=dpi, **map_overrides)
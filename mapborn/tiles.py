@@ -0,0 +1,397 @@
+"""
+tiles.py
+Web 墨卡托 (EPSG:3857) XYZ 瓦片金字塔导出：多进程逐瓦片渲染、跳过空瓦片、增量更新。
+"""
+import os
+import json
+import math
+import hashlib
+import inspect
+import multiprocessing
+import numpy as np
+from osgeo import osr
+
+from .core import RasterData, VectorData, warp_to_grid
+from .geometry import draw_geometries, GeometryBuffer
+from .utils import get_transformation, transform_extent, transform_coords
+from .cache import file_identity
+
+ORIGIN = 20037508.342789244   # EPSG:3857 世界范围半边长 (米)
+MANIFEST = 'tiles.json'
+_TILE_DPI = 72                # 瓦片以 72 dpi 渲染，线宽 1 磅即 1 像素
+_BASE_VECTOR_STYLE = {'facecolor': '#eeeeee', 'edgecolor': 'black'}
+
+# 工作进程内的全局状态，由 _init_worker 设置
+_JOB = None
+_VECTORS = {}
+
+
+def web_mercator_crs():
+    """返回 Web 墨卡托 (EPSG:3857) 坐标系 (x, y 顺序)。"""
+    crs = osr.SpatialReference()
+    crs.ImportFromEPSG(3857)
+    crs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    return crs
+
+
+def tile_bounds(z, x, y):
+    """瓦片 (z, x, y) 的 EPSG:3857 范围 [xmin, xmax, ymin, ymax]，y 自北向南编号。"""
+    size = 2 * ORIGIN / (1 << z)
+    xmin = -ORIGIN + x * size
+    ymax = ORIGIN - y * size
+    return [xmin, xmin + size, ymax - size, ymax]
+
+
+def tile_range(extent, z):
+    """与 EPSG:3857 范围 extent 相交的瓦片编号区间 (x0, x1, y0, y1)，均为闭区间。"""
+    n = 1 << z
+    size = 2 * ORIGIN / n
+    xmin, xmax, ymin, ymax = extent
+
+    def clamp(v):
+        return min(max(int(math.floor(v)), 0), n - 1)
+
+    # 右、下边界恰好落在瓦片边线上时不包含下一块瓦片
+    return (clamp((xmin + ORIGIN) / size), clamp((xmax + ORIGIN) / size - 1e-9),
+            clamp((ORIGIN - ymax) / size), clamp((ORIGIN - ymin) / size - 1e-9))
+
+
+def export_tiles(filepath, template, out_dir, zooms, processes=None, tile_size=256,
+                 resample='nearest', gdal_cache_mb=256, chunksize=16, mp_context=None):
+    """
+    按地图模板将底图与叠加栅格、矢量渲染为 XYZ 瓦片金字塔 (out_dir/z/x/y.png)。
+
+    模板中的 set_cmap、set_clim、add_raster 与 add_vector 调用会应用到每块瓦片，
+    指北针、比例尺、经纬网、色带与标题等整图装饰不会绘制到瓦片上；
+    set_bands 与 add_point_density 暂不支持，模板中包含时引发 ValueError。
+    底图与未指定 vmin/vmax 的叠加栅格的色带范围在导出前对整幅栅格统一计算一次，
+    保证瓦片之间颜色一致。
+
+    每块瓦片在工作进程中独立渲染：栅格通过 GDAL Warp 仅读取覆盖该瓦片的源窗口
+    (缩小级别时自动使用金字塔)，矢量按瓦片范围做空间过滤后读取。
+    与 Map 一致，瓦片内容限制在地图范围 (模板的 bbox，或底图范围) 之内：栅格只使用该范围内的
+    像元，矢量只读取与该范围相交的要素，并按该范围的轮廓裁剪。
+    栅格全部为 NoData 且没有矢量要素的瓦片不会写出。
+
+    out_dir 下的 tiles.json 记录输入签名与各瓦片的内容摘要。再次导出时，若输入文件与样式
+    未变，已有瓦片直接跳过；否则重新计算各瓦片内容，仅重写摘要发生变化的瓦片，
+    并删除已变为空的瓦片。缩放级别或范围变化后不再属于本次导出的旧瓦片同样被删除。
+
+    Args:
+        filepath (str): 底图路径 (栅格或矢量)。
+        template (MapTemplate): 地图模板 (mapborn.batch.MapTemplate)。
+        out_dir (str): 输出目录。
+        zooms (iterable): 缩放级别，如 range(0, 12)。
+        processes (int): 工作进程数，默认为 CPU 核数；为 0 时在当前进程中依次渲染。
+        tile_size (int): 瓦片边长 (像素)，默认 256。
+        resample (str): 栅格重采样方式 ('nearest', 'bilinear', 'average' 等)。
+        gdal_cache_mb (int): 每个工作进程的 GDAL 块缓存上限 (MB)。
+        chunksize (int): 每次分派给工作进程的瓦片数。
+        mp_context (str): multiprocessing 启动方式 ('fork', 'spawn', 'forkserver')。
+    Returns:
+        dict: 各状态的瓦片数 {'written', 'unchanged', 'empty', 'removed'}。
+    """
+    job = _build_job(filepath, template, tile_size, resample)
+    merc = web_mercator_crs()
+    merc_extent = transform_extent(job['extent'], job['crs'], merc)
+    merc_extent = [max(merc_extent[0], -ORIGIN), min(merc_extent[1], ORIGIN),
+                   max(merc_extent[2], -ORIGIN), min(merc_extent[3], ORIGIN)]
+    job['merc_extent'] = merc_extent
+    job['outline'] = _outline(job['extent'], job['crs'], merc)
+    job['crs'] = None  # osr 对象无法 pickle，工作进程中不再需要
+
+    signature = _digest(job['identity'], job['style'])
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    previous = {}
+    trusted = False
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        previous = manifest.get('tiles', {})
+        # 签名一致时记录的摘要可直接沿用，否则仅用于逐块比较
+        trusted = manifest.get('signature') == signature
+
+    tasks = []
+    for z in zooms:
+        x0, x1, y0, y1 = tile_range(merc_extent, z)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                key = f"{z}/{x}/{y}"
+                tasks.append((z, x, y, previous.get(key, ''), trusted))
+
+    counts = {'written': 0, 'unchanged': 0, 'empty': 0, 'removed': 0}
+    tiles = {}
+
+    def collect(results):
+        for key, status, digest in results:
+            counts[status] += 1
+            tiles[key] = digest
+
+    os.makedirs(out_dir, exist_ok=True)
+    job['out_dir'] = out_dir
+    if processes == 0:
+        _init_worker(job, None)
+        try:
+            collect(_render_tile(task) for task in tasks)
+        finally:
+            _close_worker()
+    else:
+        ctx = multiprocessing.get_context(mp_context)
+        with ctx.Pool(processes=processes or os.cpu_count(), initializer=_init_worker,
+                      initargs=(job, gdal_cache_mb)) as pool:
+            collect(pool.imap_unordered(_render_tile, tasks, chunksize=chunksize))
+
+    for key in previous.keys() - tiles.keys():
+        if _remove_tile(out_dir, key):
+            counts['removed'] += 1
+
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'signature': signature, 'tile_size': tile_size, 'tiles': tiles}, f)
+    os.replace(tmp_path, manifest_path)
+    return counts
+
+
+def _build_job(filepath, template, tile_size, resample):
+    """在主进程中解析模板，得到可 pickle 的瓦片渲染参数。"""
+    from .plot import Map
+
+    map_kwargs = template.map_kwargs
+    if map_kwargs.get('bands') is not None:
+        raise ValueError("瓦片导出暂不支持 RGB 波段合成，请使用单波段色带渲染。")
+    nodata = map_kwargs.get('nodata')
+    bbox = map_kwargs.get('bbox')
+
+    cmap, clim, overlays, rasters = 'terrain', None, [], []
+    for name, args, kwargs in template.calls:
+        if name in ('set_bands', 'add_point_density'):
+            raise ValueError(f"瓦片导出暂不支持 {name}，请从模板中移除该调用。")
+        if name in ('set_cmap', 'set_clim', 'add_raster', 'add_vector'):
+            bound = inspect.signature(getattr(Map, name)).bind(None, *args, **kwargs)
+            bound.apply_defaults()
+            params = dict(bound.arguments)
+            params.pop('self')
+        if name == 'set_cmap':
+            cmap = params['cmap_name']
+        elif name == 'set_clim':
+            clim = params
+        elif name == 'add_raster':
+            rasters.append(params)
+        elif name == 'add_vector':
+            if params['column'] is not None:
+                print(f"警告: 瓦片导出暂不支持按属性着色，图层 {params['filepath']} 使用统一样式。")
+            overlays.append({'filepath': params['filepath'], 'simplify': params['simplify'],
+                             'kwargs': params['kwargs']})
+
+    for raster in rasters:
+        if raster['vmin'] is None or raster['vmax'] is None:
+            overlay = RasterData(raster['filepath'], nodata=raster['nodata'], band=raster['band'])
+            try:
+                lo, hi = overlay.clim(mode='minmax')
+            finally:
+                overlay.close()
+            raster['vmin'] = float(lo) if raster['vmin'] is None else raster['vmin']
+            raster['vmax'] = float(hi) if raster['vmax'] is None else raster['vmax']
+
+    try:
+        base = RasterData(filepath, nodata=nodata, window=bbox)
+        base_type = 'raster'
+    except FileNotFoundError:
+        try:
+            base = VectorData(filepath)
+        except FileNotFoundError:
+            raise ValueError(f"无法识别文件格式或打开失败: {filepath}")
+        base_type = 'vector'
+
+    crs = base.crs
+    extent = list(bbox) if base_type == 'vector' and bbox is not None else base.extent
+    # 指定 bbox 时栅格只使用对齐到像元后的读取范围内的像元
+    window = base.extent if base_type == 'raster' and bbox is not None else None
+    vmin = vmax = None
+    if base_type == 'raster':
+        clim = clim or {'vmin': None, 'vmax': None, 'mode': 'minmax', 'p': (2, 98), 'k': 2.0,
+                        'approx': None}
+        vmin, vmax = clim['vmin'], clim['vmax']
+        if vmin is None or vmax is None:
+            lo, hi = base.clim(mode=clim['mode'] or 'minmax', p=clim['p'], k=clim['k'],
+                               approx=clim['approx'])
+            vmin = lo if vmin is None else vmin
+            vmax = hi if vmax is None else vmax
+    else:
+        overlays.insert(0, {'filepath': filepath, 'simplify': None, 'kwargs': _BASE_VECTOR_STYLE})
+    base.close()
+
+    style = {'base_type': base_type, 'nodata': nodata, 'cmap': cmap, 'extent': extent,
+             'vmin': None if vmin is None else float(vmin),
+             'vmax': None if vmax is None else float(vmax),
+             'rasters': rasters, 'overlays': overlays, 'tile_size': tile_size, 'resample': resample}
+    identity = [os.path.abspath(filepath), file_identity(filepath)]
+    for overlay in rasters + overlays:
+        identity.append([os.path.abspath(overlay['filepath']), file_identity(overlay['filepath'])])
+    return {'filepath': filepath, 'crs': crs, 'extent': extent, 'window': window, 'style': style,
+            'identity': identity}
+
+
+def _outline(extent, source_crs, target_crs, densify=64):
+    """范围 [xmin, xmax, ymin, ymax] 的边界按 densify 个点加密后转换到目标坐标系，返回 (N, 2) 闭合环。"""
+    xmin, xmax, ymin, ymax = extent
+    t = np.linspace(0.0, 1.0, densify, endpoint=False)
+    xs = np.concatenate([xmin + (xmax - xmin) * t, np.full(densify, xmax),
+                         xmax - (xmax - xmin) * t, np.full(densify, xmin), [xmin]])
+    ys = np.concatenate([np.full(densify, ymin), ymin + (ymax - ymin) * t,
+                         np.full(densify, ymax), ymax - (ymax - ymin) * t, [ymin]])
+    if not source_crs.IsSame(target_crs):
+        xs, ys = transform_coords(get_transformation(source_crs, target_crs), xs, ys)
+    return np.column_stack([xs, ys])
+
+
+def _digest(*parts):
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=repr).encode('utf-8')).hexdigest()
+
+
+def _init_worker(job, gdal_cache_mb):
+    global _JOB
+    if gdal_cache_mb:
+        from osgeo import gdal
+        gdal.SetCacheMax(int(gdal_cache_mb) * 1024 * 1024)
+    _JOB = job
+    _JOB['merc'] = web_mercator_crs()
+
+
+def _close_worker():
+    global _JOB
+    for vector in _VECTORS.values():
+        vector.close()
+    _VECTORS.clear()
+    _JOB = None
+
+
+def _read_overlay(overlay, bounds, tile_size):
+    """读取与瓦片及地图范围都相交的矢量要素并转换到 EPSG:3857。"""
+    merc = _JOB['merc']
+    ext = _JOB['merc_extent']
+    window = [max(bounds[0], ext[0]), min(bounds[1], ext[1]),
+              max(bounds[2], ext[2]), min(bounds[3], ext[3])]
+    if window[0] > window[1] or window[2] > window[3]:
+        return GeometryBuffer()
+    path = overlay['filepath']
+    vector = _VECTORS.get(path)
+    if vector is None:
+        vector = _VECTORS[path] = VectorData(path)
+    vector.set_spatial_filter(window, merc)
+    geoms = vector.read_geometries()
+    if not vector.crs.IsSame(merc):
+        geoms = geoms.transform(get_transformation(vector.crs, merc))
+
+    tolerance = overlay['simplify']
+    if tolerance == 'auto':
+        tolerance = (bounds[1] - bounds[0]) / tile_size * 0.5
+    if tolerance:
+        geoms = geoms.simplify(tolerance)
+    return geoms
+
+
+def _remove_tile(out_dir, key):
+    """删除瓦片文件及随之变空的目录，文件存在时返回 True。"""
+    path = os.path.join(out_dir, *key.split('/')) + '.png'
+    if not os.path.exists(path):
+        return False
+    os.remove(path)
+    for folder in (os.path.dirname(path), os.path.dirname(os.path.dirname(path))):
+        try:
+            os.rmdir(folder)
+        except OSError:
+            break
+    return True
+
+
+def _render_tile(task):
+    """
+    渲染单块瓦片，返回 (键, 状态, 摘要)。
+
+    known 为上次导出记录的摘要 (None 表示空瓦片，'' 表示没有记录)；trusted 为 True 时
+    输入与样式均未变化，直接沿用记录。
+    """
+    z, x, y, known, trusted = task
+    key = f"{z}/{x}/{y}"
+    path = os.path.join(_JOB['out_dir'], str(z), str(x), f"{y}.png")
+    if trusted and (known is None or (known and os.path.exists(path))):
+        return key, 'empty' if known is None else 'unchanged', known
+
+    style = _JOB['style']
+    tile_size = style['tile_size']
+    bounds = tile_bounds(z, x, y)
+
+    image = None
+    if style['base_type'] == 'raster':
+        image = warp_to_grid(_JOB['filepath'], _JOB['merc'], bounds, (tile_size, tile_size),
+                             nodata=style['nodata'], resample=style['resample'], use_cache=False,
+                             window=_JOB['window'])
+        if np.ma.getmaskarray(image).all():
+            image = None
+    rasters = []
+    for raster in style['rasters']:
+        array = warp_to_grid(raster['filepath'], _JOB['merc'], bounds, (tile_size, tile_size),
+                             band=raster['band'], nodata=raster['nodata'],
+                             resample=raster['resample'], use_cache=False)
+        if not np.ma.getmaskarray(array).all():
+            rasters.append((raster, array))
+    layers = [(overlay, _read_overlay(overlay, bounds, tile_size)) for overlay in style['overlays']]
+    layers = [(overlay, geoms) for overlay, geoms in layers if geoms.vertex_count]
+
+    if image is None and not rasters and not layers:
+        if os.path.exists(path):
+            os.remove(path)
+            return key, 'removed', None
+        return key, 'empty', None
+
+    h = hashlib.sha1(_digest(style).encode('ascii'))
+    if image is not None:
+        h.update(np.ascontiguousarray(image.filled(0)).tobytes())
+        h.update(np.packbits(np.ma.getmaskarray(image)).tobytes())
+    for _, array in rasters:
+        h.update(np.ascontiguousarray(array.filled(0)).tobytes())
+        h.update(np.packbits(np.ma.getmaskarray(array)).tobytes())
+    for _, geoms in layers:
+        for array in geoms.to_arrays().values():
+            h.update(np.ascontiguousarray(array).tobytes())
+    digest = h.hexdigest()
+    if digest == known and os.path.exists(path):
+        return key, 'unchanged', digest
+
+    _save_tile(path, bounds, image, rasters, layers)
+    return key, 'written', digest
+
+
+def _save_tile(path, bounds, image, rasters, layers):
+    from matplotlib.figure import Figure
+    from matplotlib.path import Path
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    style = _JOB['style']
+    inches = style['tile_size'] / _TILE_DPI
+    fig = Figure(figsize=(inches, inches), dpi=_TILE_DPI)
+    FigureCanvasAgg(fig)
+    fig.patch.set_alpha(0)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.axis('off')
+    if image is not None:
+        ax.imshow(image, extent=bounds, cmap=style['cmap'], vmin=style['vmin'], vmax=style['vmax'],
+                  interpolation='nearest', aspect='auto')
+    # 叠加栅格与跨越地图范围边界的要素按范围轮廓裁剪，与 Map 中坐标轴范围的裁剪一致
+    outline = Path(_JOB['outline'], closed=True)
+    for raster, array in rasters:
+        overlay = ax.imshow(array, extent=bounds, cmap=raster['cmap'], alpha=raster['alpha'],
+                            vmin=raster['vmin'], vmax=raster['vmax'], interpolation='nearest',
+                            aspect='auto', zorder=raster['zorder'])
+        overlay.set_clip_path(outline, transform=ax.transData)
+    for overlay, geoms in layers:
+        for artist in draw_geometries(ax, geoms, **overlay['kwargs']):
+            artist.set_clip_path(outline, transform=ax.transData)
+    ax.set_xlim(bounds[0], bounds[1])
+    ax.set_ylim(bounds[2], bounds[3])
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp.png'
+    fig.savefig(tmp_path, dpi=_TILE_DPI, transparent=True)
+    os.replace(tmp_path, path)
@@ -1,4 +1,97 @@
+import threading
+import numpy as np
 from osgeo import osr
+from .cache import LRUCache
+
+
+class TransformCache:
+    """
+    进程级 CoordinateTransformation LRU 缓存。
+
+    键为规范化后的坐标系对 (WKT2 + 轴顺序策略)。PROJ 转换对象不是线程安全的，
+    因此键中同时包含线程标识，每个线程持有各自的转换对象。
+    """
+
+    def __init__(self, maxsize=128):
+        self._cache = LRUCache(maxsize)
+
+    @property
+    def maxsize(self):
+        return self._cache.maxsize
+
+    @property
+    def hits(self):
+        return self._cache.hits
+
+    @property
+    def misses(self):
+        return self._cache.misses
+
+    def get(self, source_crs, target_crs):
+        """返回 source_crs -> target_crs 的转换对象，命中时不再重建 PROJ 管道。"""
+        key = (_crs_key(source_crs), _crs_key(target_crs), threading.get_ident())
+        trans = self._cache.get(key)
+        if trans is None:
+            trans = osr.CoordinateTransformation(source_crs, target_crs)
+            self._cache.put(key, trans)
+        return trans
+
+    def resize(self, maxsize):
+        self._cache.resize(maxsize)
+
+    def clear(self):
+        self._cache.clear()
+
+    def info(self):
+        """缓存统计 {'hits', 'misses', 'hit_rate', 'size', 'maxsize'}"""
+        return self._cache.info()
+
+
+TRANSFORM_CACHE = TransformCache()
+_WGS84 = None
+
+
+def _crs_key(crs):
+    return (crs.ExportToWkt(['FORMAT=WKT2_2018']), crs.GetAxisMappingStrategy(),
+            tuple(crs.GetDataAxisToSRSAxisMapping()))
+
+
+def get_transformation(source_crs, target_crs):
+    """从进程级缓存获取坐标转换对象。"""
+    return TRANSFORM_CACHE.get(source_crs, target_crs)
+
+
+def wgs84_crs():
+    """返回 WGS84 (经度, 纬度顺序) 坐标系的副本，EPSG 查询只进行一次。"""
+    global _WGS84
+    if _WGS84 is None:
+        crs = osr.SpatialReference()
+        crs.ImportFromEPSG(4326)  # WGS84
+        crs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        _WGS84 = crs
+    crs = _WGS84.Clone()
+    crs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    return crs
+
+
+def transform_coords(coord_trans, xs, ys):
+    """
+    使用一次 TransformPoints 调用批量转换坐标。
+
+    Args:
+        coord_trans: osr.CoordinateTransformation 对象。
+        xs, ys: 任意形状、相同形状的坐标数组。
+
+    Returns:
+        (xs, ys): 与输入形状相同的 float64 数组。
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    if xs.size == 0:
+        return xs.copy(), ys.copy()
+    pts = np.column_stack([xs.ravel(), ys.ravel()])
+    res = np.asarray(coord_trans.TransformPoints(pts), dtype=np.float64)
+    return res[:, 0].reshape(xs.shape), res[:, 1].reshape(ys.shape)
 
 
 class GeoTransformer:
@@ -6,12 +99,10 @@ class GeoTransformer:
         self.source_crs = source_crs
         self.source_crs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
 
-        self.target_crs = osr.SpatialReference()
-        self.target_crs.ImportFromEPSG(4326)  # WGS84
-        self.target_crs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        self.target_crs = wgs84_crs()
 
-        self._to_wgs84 = osr.CoordinateTransformation(self.source_crs, self.target_crs)
-        self._to_source = osr.CoordinateTransformation(self.target_crs, self.source_crs)
+        self._to_wgs84 = get_transformation(self.source_crs, self.target_crs)
+        self._to_source = get_transformation(self.target_crs, self.source_crs)
 
     def transform_point(self, x, y):
         """Source -> WGS84 (Lon, Lat)"""
@@ -23,16 +114,37 @@ class GeoTransformer:
         res = self._to_source.TransformPoint(lon, lat)
         return res[0], res[1]
 
+    def transform_points(self, xs, ys):
+        """Source -> WGS84 (Lon, Lat)，数组输入输出"""
+        return transform_coords(self._to_wgs84, xs, ys)
+
+    def transform_points_inverse(self, lons, lats):
+        """WGS84 (Lon, Lat) -> Source (X, Y)，数组输入输出"""
+        return transform_coords(self._to_source, lons, lats)
+
     def get_wgs84_bounds(self, extent):
         """获取 Extent 对应的经纬度范围 [min_lon, max_lon, min_lat, max_lat]"""
         xmin, xmax, ymin, ymax = extent
         # 采样四个角点
-        corners = [
-            self.transform_point(xmin, ymin),
-            self.transform_point(xmin, ymax),
-            self.transform_point(xmax, ymin),
-            self.transform_point(xmax, ymax)
-        ]
-        lons = [c[0] for c in corners]
-        lats = [c[1] for c in corners]
-        return [min(lons), max(lons), min(lats), max(lats)]
\ No newline at end of file
+        lons, lats = self.transform_points([xmin, xmin, xmax, xmax], [ymin, ymax, ymin, ymax])
+        return [float(lons.min()), float(lons.max()), float(lats.min()), float(lats.max())]
+
+
+def transform_extent(extent, source_crs, target_crs, densify=21):
+    """
+    将范围 [xmin, xmax, ymin, ymax] 转换到另一坐标系。
+    边界按 densify 个点加密后批量转换，取外包矩形，以容纳投影造成的弯曲。
+    """
+    if source_crs is None or target_crs is None or source_crs.IsSame(target_crs):
+        return list(extent)
+    xmin, xmax, ymin, ymax = extent
+    t = np.linspace(0.0, 1.0, densify)
+    xs = np.concatenate([xmin + (xmax - xmin) * t, np.full(densify, xmax),
+                         xmax - (xmax - xmin) * t, np.full(densify, xmin)])
+    ys = np.concatenate([np.full(densify, ymin), ymin + (ymax - ymin) * t,
+                         np.full(densify, ymax), ymax - (ymax - ymin) * t])
+    txs, tys = transform_coords(get_transformation(source_crs, target_crs), xs, ys)
+    ok = np.isfinite(txs) & np.isfinite(tys)
+    if not ok.any():
+        raise ValueError(f"范围无法转换到目标坐标系: {extent}")
+    return [float(txs[ok].min()), float(txs[ok].max()), float(tys[ok].min()), float(tys[ok].max())]